@@ -0,0 +1,222 @@
+"""Load suite for the API: throughput and p50/p95/p99 per endpoint and concurrency level.
+
+Seeds a temporary SQLite database with --users users of --tasks tasks each, then runs every
+scenario at every --concurrency level (N client loops for --seconds):
+
+  signup           POST /auth/signup (new username per request)
+  login            POST /auth/login
+  list             GET /tasks/
+  list_incomplete  GET /tasks/?status=incomplete
+  list_page        GET /tasks/?limit=50
+  create           POST /tasks/
+  update           PUT /tasks/{id}
+  delete           DELETE /tasks/{id}
+
+The app runs in-process through httpx.ASGITransport, or in a uvicorn subprocess with
+--uvicorn. Results are JSON (stdout or --output) with the commit and the settings used;
+--compare OLD.json prints the change against a previous run, e.g.:
+
+    python benchmarks/bench_api.py --output before.json
+    python benchmarks/bench_api.py --compare before.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import subprocess
+import time
+import uuid
+
+from common import (ROOT, asgi_client, database, seed_tasks, start_uvicorn, summarize, use_temp_database,
+                    wait_for_server)
+
+PASSWORD = "bench-password"
+
+
+# ---------------- CENÁRIOS ----------------
+# Cada cenário recebe o cliente e um usuário semeado e devolve a resposta da requisição medida
+async def signup(client, user):
+    return await client.post("/auth/signup", json={"username": f"load-{uuid.uuid4().hex}", "password": PASSWORD})
+
+
+async def login(client, user):
+    return await client.post("/auth/login", data={"username": user["username"], "password": PASSWORD})
+
+
+async def list_all(client, user):
+    return await client.get("/tasks/", headers=user["headers"])
+
+
+async def list_incomplete(client, user):
+    return await client.get("/tasks/", headers=user["headers"], params={"status": "incomplete"})
+
+
+async def list_page(client, user):
+    return await client.get("/tasks/", headers=user["headers"], params={"limit": 50})
+
+
+async def create(client, user):
+    return await client.post("/tasks/", headers=user["headers"], json={"name": "load test"})
+
+
+async def update(client, user):
+    task_id = next(user["ids"])
+    return await client.put(f"/tasks/{task_id}", headers=user["headers"], json={"name": f"renamed {task_id}"})
+
+
+async def delete(client, user):
+    return await client.delete(f"/tasks/{user['deletable'].pop()}", headers=user["headers"])
+
+
+async def prepare_delete(client, user):
+    # Cada remoção consome uma task; acabando as semeadas, cria outra fora da medição
+    if not user["deletable"]:
+        resp = await client.post("/tasks/", headers=user["headers"], json={"name": "to delete"})
+        user["deletable"].append(resp.json()["id"])
+
+
+SCENARIOS = {
+    "signup": signup,
+    "login": login,
+    "list": list_all,
+    "list_incomplete": list_incomplete,
+    "list_page": list_page,
+    "create": create,
+    "update": update,
+    "delete": delete,
+}
+PREPARE = {"delete": prepare_delete}
+
+
+async def client_loop(client, name, users, deadline, samples, errors):
+    scenario, prepare = SCENARIOS[name], PREPARE.get(name)
+    for user in itertools.cycle(users):
+        if time.perf_counter() >= deadline:
+            return
+        if prepare:
+            await prepare(client, user)
+        start = time.perf_counter()
+        resp = await scenario(client, user)
+        samples.append(time.perf_counter() - start)
+        if resp.status_code != 200:
+            errors[resp.status_code] = errors.get(resp.status_code, 0) + 1
+
+
+async def run_scenario(client, name, users, concurrency, seconds):
+    samples, errors = [], {}
+    # Cada cliente começa por um usuário diferente
+    offsets = [users[i % len(users):] + users[:i % len(users)] for i in range(concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop(client, name, offsets[i], start + seconds, samples, errors)
+                           for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {"scenario": name, "concurrency": concurrency, "requests": len(samples),
+            "requests_per_sec": round(len(samples) / elapsed, 1), "errors": errors, **summarize(samples)}
+
+
+# ---------------- SEMENTE ----------------
+async def seed_users(client, count, tasks):
+    from sqlalchemy import select
+    from todo.backend import models
+
+    users = []
+    for i in range(count):
+        username = f"bench-{i}"
+        await client.post("/auth/signup", json={"username": username, "password": PASSWORD})
+        resp = await client.post("/auth/login", data={"username": username, "password": PASSWORD})
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+        user_id = (await client.get("/users/me", headers=headers)).json()["id"]
+        seed_tasks(user_id, tasks)
+        with database().SessionLocal() as db:
+            ids = db.scalars(select(models.Task.id).filter(models.Task.owner_id == user_id)).all()
+        # metade para update (em ciclo), metade para delete
+        half = len(ids) // 2
+        users.append({"username": username, "headers": headers,
+                      "ids": itertools.cycle(ids[:half] or [0]), "deletable": list(ids[half:])})
+    return users
+
+
+# ---------------- EXECUÇÃO ----------------
+def metadata(args):
+    from todo.backend import settings
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    keys = ["ASYNC_DB", "GROUP_COMMIT", "SQLITE_WAL", "HASH_WORKERS", "BCRYPT_ROUNDS", "DB_POOL_SIZE",
+            "METRICS_ENABLED"]
+    return {"commit": commit, "python": platform.python_version(), "mode": "uvicorn" if args.uvicorn else "asgi",
+            "users": args.users, "tasks_per_user": args.tasks, "seconds": args.seconds,
+            "settings": {key: getattr(settings, key) for key in keys}}
+
+
+async def run(args, url=None):
+    import httpx
+
+    if url:
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        client = httpx.AsyncClient(base_url=url, timeout=None, limits=limits)
+    else:
+        from todo.backend.main import app
+        client = asgi_client(app, raise_app_exceptions=False)
+    async with client as client:
+        if url:
+            await wait_for_server(client)
+        users = await seed_users(client, args.users, args.tasks)
+        results = []
+        for name in args.scenarios:
+            for concurrency in args.concurrency:
+                results.append(await run_scenario(client, name, users, concurrency, args.seconds))
+    return results
+
+
+def compare(old, new):
+    # Variação de throughput e latência por (cenário, concorrência) em relação a uma execução anterior
+    before = {(r["scenario"], r["concurrency"]): r for r in old["results"]}
+    print(f"{old['meta']['commit']} ({old['meta']['mode']}) -> {new['meta']['commit']} ({new['meta']['mode']})")
+    print(f"{'scenario':<16}{'conc':>5}{'req/s':>18}{'p50 ms':>20}{'p99 ms':>20}")
+    for r in new["results"]:
+        o = before.get((r["scenario"], r["concurrency"]))
+        if not o:
+            continue
+        cols = [f"{o[k]:.1f} -> {r[k]:.1f}" for k in ("requests_per_sec", "p50_ms", "p99_ms")]
+        print(f"{r['scenario']:<16}{r['concurrency']:>5}{cols[0]:>18}{cols[1]:>20}{cols[2]:>20}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--tasks", type=int, default=1000, help="tasks per user")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--uvicorn", action="store_true", help="run the API in a uvicorn subprocess")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--compare", help="previous --output file to compare against")
+    args = parser.parse_args()
+
+    tmp = use_temp_database()
+    server, url = start_uvicorn(tmp) if args.uvicorn else (None, None)
+    try:
+        results = asyncio.run(run(args, url))
+    finally:
+        if server:
+            server.kill()
+            server.wait()
+
+    report = {"meta": metadata(args), "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+    elif not args.output:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Listing latency before and after archiving, on an account where most tasks are completed.
+
+Seeds --tasks tasks (--complete of them completed), measures the list endpoints, runs the
+archiver (ARCHIVE_AFTER_SECONDS=0, batches of --batch tasks, each one writer transaction)
+and measures again, plus the same listings with include_archived=true.
+"""
+import argparse
+import json
+import time
+
+from common import seed_tasks, signup_and_login, summarize, use_temp_database
+
+use_temp_database()
+
+from fastapi.testclient import TestClient  # noqa: E402
+from todo.backend import crud, settings  # noqa: E402
+from todo.backend.main import create_app  # noqa: E402
+from todo.backend.writer import run_write  # noqa: E402
+
+REQUESTS = {
+    "list_all": ("/tasks/", {}),
+    "list_page": ("/tasks/", {"limit": 50}),
+    "list_page_with_stats": ("/tasks/", {"limit": 50, "with_stats": True}),
+    "incomplete_page": ("/tasks/", {"status": "incomplete", "limit": 50}),
+    "complete_page": ("/tasks/", {"status": "complete", "limit": 50}),
+    "stats": ("/tasks/stats", {}),
+}
+
+
+def measure(client, headers, rounds, extra=None):
+    results = {}
+    for name, (path, params) in REQUESTS.items():
+        samples, size = [], 0
+        for _ in range(rounds):
+            start = time.perf_counter()
+            resp = client.get(path, headers=headers, params={**params, **(extra or {})})
+            samples.append(time.perf_counter() - start)
+            size = len(resp.content)
+        results[name] = {"bytes": size, **summarize(samples)}
+    return results
+
+
+def archive(database, batch):
+    # Mesmo laço de main.archive_tasks, medindo cada lote (a transação que segura o lock de escrita)
+    from datetime import datetime
+    samples, before = [], datetime.utcnow()
+    with database.SessionLocal() as db:
+        while True:
+            start = time.perf_counter()
+            count = run_write(db, crud.archive_tasks, before, batch)
+            samples.append(time.perf_counter() - start)
+            if count < batch:
+                break
+    return {"seconds": round(sum(samples), 2), "batch": summarize(samples)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--complete", type=float, default=0.9, help="fraction of completed tasks")
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app(settings.override(ARCHIVE_INTERVAL_SECONDS=0, ARCHIVE_AFTER_SECONDS=0))
+    with TestClient(app) as client:
+        headers = signup_and_login(client, "bench")
+        seed_tasks(client.get("/users/me", headers=headers).json()["id"], args.tasks, args.complete)
+
+        results = {"tasks": args.tasks, "complete": args.complete,
+                   "before": measure(client, headers, args.rounds)}
+        results["archive"] = archive(app.state.database, args.batch)
+        results["after"] = measure(client, headers, args.rounds)
+        results["after_include_archived"] = measure(client, headers, args.rounds, {"include_archived": True})
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
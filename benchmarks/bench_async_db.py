@@ -0,0 +1,68 @@
+"""Requests/sec and latency with N concurrent clients, sync routes vs. ASYNC_DB=true.
+
+Run once per mode, e.g.:
+    python benchmarks/bench_async_db.py --clients 500
+    ASYNC_DB=true python benchmarks/bench_async_db.py --clients 500
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from common import asgi_client, use_temp_database, seed_tasks, summarize
+
+use_temp_database()
+
+from todo.backend.main import app  # noqa: E402
+from todo.backend.settings import ASYNC_DB  # noqa: E402
+
+
+async def client_loop(client, headers, deadline, write_every, samples, errors):
+    i = 0
+    while time.perf_counter() < deadline:
+        i += 1
+        start = time.perf_counter()
+        if write_every and i % write_every == 0:
+            resp = await client.post("/tasks/", headers=headers, json={"name": f"bench {i}"})
+        else:
+            resp = await client.get("/tasks/", headers=headers, params={"limit": 50})
+        samples.append(time.perf_counter() - start)
+        if resp.status_code != 200:
+            errors[resp.status_code] = errors.get(resp.status_code, 0) + 1
+
+
+async def run(args):
+    async with asgi_client(app) as client:
+        await client.post("/auth/signup", json={"username": "bench", "password": "bench-password"})
+        resp = await client.post("/auth/login", data={"username": "bench", "password": "bench-password"})
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+        seed_tasks(1, args.tasks)
+
+        samples, errors = [], {}
+        start = time.perf_counter()
+        deadline = start + args.seconds
+        await asyncio.gather(*(client_loop(client, headers, deadline, args.write_every, samples, errors)
+                               for _ in range(args.clients)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "async_db": ASYNC_DB,
+        "clients": args.clients,
+        "requests_per_sec": round(len(samples) / elapsed, 1),
+        "errors": errors,
+        **summarize(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--write-every", type=int, default=5, help="every Nth request is a POST (0 = read only)")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Cold start of the API: importing the app module and a multi-worker uvicorn launch.
+
+  import   `import todo.backend.main` in a fresh interpreter (median of --rounds)
+  uvicorn  `uvicorn --workers N`: time until the first request is answered and until every
+           worker logged "Application startup complete", on a new and on an existing database
+"""
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+from common import ROOT, free_port
+
+SRC = os.path.join(ROOT, "src")
+
+
+def measure_import(rounds):
+    env = {**os.environ, "PYTHONPATH": SRC}
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import todo.backend.main"], env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    return {"median_ms": round(statistics.median(samples) * 1000, 1), "min_ms": round(min(samples) * 1000, 1)}
+
+
+def measure_uvicorn(workers, database_url):
+    port = free_port()
+    env = {**os.environ, "PYTHONPATH": SRC, "DATABASE_URL": database_url}
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "todo.backend.main:app", "--port", str(port),
+                               "--workers", str(workers), "--log-level", "info", "--no-access-log"],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+                              start_new_session=True)
+    ready = []
+
+    def read_log():
+        for line in server.stderr:
+            if "Application startup complete" in line:
+                ready.append(time.perf_counter() - start)
+
+    reader = threading.Thread(target=read_log, daemon=True)
+    reader.start()
+    first_response = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+            while time.perf_counter() - start < 60:
+                try:
+                    client.get("/openapi.json")
+                    first_response = time.perf_counter() - start
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.01)
+        while len(ready) < workers and time.perf_counter() - start < 60:
+            time.sleep(0.01)
+    finally:
+        # Grupo inteiro: com --workers, matar só o supervisor deixa os workers órfãos
+        os.killpg(server.pid, signal.SIGKILL)
+        server.wait()
+    return {"workers": workers,
+            "first_response_ms": round(first_response * 1000, 1) if first_response else None,
+            "all_workers_ready_ms": round(max(ready) * 1000, 1) if len(ready) >= workers else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    results = {"import": measure_import(args.rounds), "uvicorn": []}
+    for workers in args.workers:
+        tmp = tempfile.mkdtemp(prefix="todo-bench-")
+        url = f"sqlite:///{tmp}/todo.db"
+        # banco novo (migrações rodam) e, em seguida, o mesmo banco já migrado
+        results["uvicorn"].append({"database": "new", **measure_uvicorn(workers, url)})
+        results["uvicorn"].append({"database": "existing", **measure_uvicorn(workers, url)})
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Throughput of GET /tasks/export and POST /tasks/import (rows/sec), NDJSON and CSV.
+
+Seeds --tasks tasks for one user, exports them in each format to a file and imports the file
+back (streamed upload, --chunk bytes at a time) into a new user. The API runs in a uvicorn
+subprocess; peak_rss_mb is the server's peak resident memory during each phase (VmHWM,
+reset before the phase through /proc/<pid>/clear_refs), to check that memory stays flat.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import httpx
+
+from common import database, seed_tasks, signup_and_login, start_uvicorn, use_temp_database
+
+
+def reset_peak_rss(pid):
+    try:
+        with open(f"/proc/{pid}/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        return None
+
+
+def export(client, headers, format, path, server):
+    reset_peak_rss(server.pid)
+    start = time.perf_counter()
+    size = 0
+    with client.stream("GET", "/tasks/export", headers=headers, params={"format": format}) as response:
+        response.raise_for_status()
+        with open(path, "wb") as f:
+            for data in response.iter_raw():
+                f.write(data)
+                size += len(data)
+    return time.perf_counter() - start, size
+
+
+def upload(client, headers, format, path, batch_size, chunk, server):
+    def body():
+        with open(path, "rb") as f:
+            while data := f.read(chunk):
+                yield data
+
+    reset_peak_rss(server.pid)
+    start = time.perf_counter()
+    response = client.post("/tasks/import", headers=headers, content=body(),
+                           params={"format": format, "batch_size": batch_size})
+    response.raise_for_status()
+    return time.perf_counter() - start, response.json()["count"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--formats", nargs="+", choices=["ndjson", "csv"], default=["ndjson", "csv"])
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per import transaction")
+    parser.add_argument("--chunk", type=int, default=64 * 1024, help="upload chunk size in bytes")
+    args = parser.parse_args()
+
+    tmp = use_temp_database()
+    server, url = start_uvicorn(tmp, {"HASH_WORKERS": "0"})
+    results = {"tasks": args.tasks, "batch_size": args.batch_size, "results": []}
+    try:
+        with httpx.Client(base_url=url, timeout=None) as client:
+            for _ in range(100):
+                try:
+                    client.get("/docs")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            headers = signup_and_login(client, "source")
+            seed_tasks(client.get("/users/me", headers=headers).json()["id"], args.tasks)
+            database().engine.dispose()
+
+            for format in args.formats:
+                path = os.path.join(tempfile.mkdtemp(prefix="todo-bench-"), f"tasks.{format}")
+                elapsed, size = export(client, headers, format, path, server)
+                exported = {"rows_per_sec": round(args.tasks / elapsed), "seconds": round(elapsed, 2),
+                            "mb": round(size / 2**20, 1), "peak_rss_mb": peak_rss_mb(server.pid)}
+
+                target = signup_and_login(client, f"import-{format}")
+                elapsed, count = upload(client, target, format, path, args.batch_size, args.chunk, server)
+                imported = {"rows": count, "rows_per_sec": round(count / elapsed), "seconds": round(elapsed, 2),
+                            "peak_rss_mb": peak_rss_mb(server.pid)}
+                results["results"].append({"format": format, "export": exported, "import": imported})
+                os.remove(path)
+    finally:
+        server.kill()
+        server.wait()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Fan-out latency of task events (GET /tasks/events) with many connected subscribers.
+
+  broker  in-process: N subscriptions on the event loop, events published from another thread
+          (as the writer / request threads do); latency = publish -> subscriber receives
+  http    uvicorn in a subprocess and N SSE connections; latency = POST /tasks/ sent ->
+          event parsed by each subscriber (client and server share the machine's CPUs)
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from common import start_uvicorn, use_temp_database, summarize, wait_for_server
+
+
+def fanout_stats(rounds):
+    # rounds: lista de listas de latências (uma por inscrito)
+    everyone = [lat for r in rounds for lat in r]
+    return {"subscribers": len(rounds[0]) if rounds else 0, "rounds": len(rounds),
+            **summarize(everyone),
+            "last_subscriber_p50_ms": round(sorted(max(r) for r in rounds)[len(rounds) // 2] * 1000, 3)}
+
+
+def run_broker(subscribers, rounds):
+    use_temp_database()
+    from todo.backend.events import EventBroker
+
+    async def run():
+        broker = EventBroker(queue_size=100)
+        subs = [broker.subscribe(1) for _ in range(subscribers)]
+        results = []
+        for i in range(rounds):
+            start = time.perf_counter()
+            await asyncio.to_thread(broker.publish, 1, json.dumps({"token": i}))
+            arrivals = []
+            for sub in subs:
+                await sub.get()
+                arrivals.append(time.perf_counter() - start)
+            results.append(arrivals)
+        return results
+
+    return fanout_stats(asyncio.run(run()))
+
+
+def run_http(subscribers, rounds):
+    import httpx
+
+    tmp = use_temp_database()
+    env = {"HASH_WORKERS": "0", "EVENTS_QUEUE_SIZE": str(max(100, rounds + 10))}
+    server, url = start_uvicorn(tmp, env, "--backlog", str(subscribers + 64))
+
+    async def subscriber(client, headers, ready, arrivals):
+        async with client.stream("GET", "/tasks/events", headers=headers) as response:
+            event = None
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    if event == "ready":
+                        ready.release()
+                    elif event == "tasks":
+                        arrivals.append((json.loads(line[5:])["token"], time.perf_counter()))
+
+    async def run():
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(base_url=url, timeout=None, limits=limits) as client:
+            await wait_for_server(client)
+            await client.post("/auth/signup", json={"username": "bench", "password": "bench-password"})
+            resp = await client.post("/auth/login", data={"username": "bench", "password": "bench-password"})
+            headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+            ready = asyncio.Semaphore(0)
+            arrivals = [[] for _ in range(subscribers)]
+            tasks = [asyncio.create_task(subscriber(client, headers, ready, arrivals[i])) for i in range(subscribers)]
+            for _ in range(subscribers):
+                await ready.acquire()
+
+            results = []
+            for i in range(rounds):
+                start = time.perf_counter()
+                await client.post("/tasks/", headers=headers, json={"name": f"t{i}"})
+                token = i + 1  # versão do usuário após a i-ésima criação
+                while sum(1 for a in arrivals if a and a[-1][0] >= token) < subscribers:
+                    await asyncio.sleep(0.001)
+                results.append([a[-1][1] - start for a in arrivals])
+                await asyncio.sleep(0.05)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            return results
+
+    try:
+        return fanout_stats(asyncio.run(run()))
+    finally:
+        server.kill()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["broker", "http", "all"], default="all")
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    results = {}
+    if args.mode in ("broker", "all"):
+        results["broker"] = run_broker(args.subscribers, args.rounds)
+    if args.mode in ("http", "all"):
+        results["http"] = run_http(args.subscribers, args.rounds)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Task endpoint latency while a login storm is running.
+
+Compare modes with HASH_WORKERS=0 (bcrypt on the request threadpool) vs. HASH_WORKERS=N.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from common import asgi_client, use_temp_database, seed_tasks, summarize
+
+use_temp_database()
+
+from todo.backend.main import app  # noqa: E402
+from todo.backend.settings import BCRYPT_ROUNDS, HASH_WORKERS  # noqa: E402
+
+
+async def login_loop(client, stop, counters):
+    while not stop.is_set():
+        resp = await client.post("/auth/login", data={"username": "bench", "password": "bench-password"})
+        counters[resp.status_code] = counters.get(resp.status_code, 0) + 1
+
+
+async def measure_tasks(client, headers, seconds):
+    samples = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await client.get("/tasks/", headers=headers, params={"limit": 50})
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+async def run(args):
+    async with asgi_client(app) as client:
+        await client.post("/auth/signup", json={"username": "bench", "password": "bench-password"})
+        resp = await client.post("/auth/login", data={"username": "bench", "password": "bench-password"})
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+        seed_tasks(1, args.tasks)
+
+        idle = await measure_tasks(client, headers, args.seconds)
+
+        stop, counters = asyncio.Event(), {}
+        storm = [asyncio.create_task(login_loop(client, stop, counters)) for _ in range(args.logins)]
+        loaded = await measure_tasks(client, headers, args.seconds)
+        stop.set()
+        await asyncio.gather(*storm)
+
+    return {
+        "bcrypt_rounds": BCRYPT_ROUNDS,
+        "hash_workers": HASH_WORKERS,
+        "concurrent_logins": args.logins,
+        "tasks_idle": idle,
+        "tasks_during_storm": loaded,
+        "login_status_counts": counters,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Server CPU and legitimate login latency during a credential-stuffing burst on /auth/login.
+
+For the login limit off (LOGIN_*_MAX_ATTEMPTS=0) and on (--ip-limit / --user-limit failed
+attempts per LOGIN_THROTTLE_WINDOW_SECONDS, lower than the defaults so that a short run
+crosses them), a uvicorn server
+(one worker, HASH_WORKERS=0 so bcrypt runs inside the measured process) is attacked for
+--seconds by --attackers concurrent loops spread over --attack-ips client IPs (sent as
+X-Forwarded-For), trying wrong passwords on a mix of existing and unknown usernames. Meanwhile
+one legitimate user logs in every --interval seconds from its own IP. Reports the server's CPU
+use, the attack responses by status and the legitimate logins' latency, next to a baseline
+without attack.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from common import ROOT, free_port, summarize, wait_for_server
+
+PASSWORD = "bench-password"
+LEGIT_IP = "192.168.0.1"
+
+
+def start_server(args, throttle):
+    tmp = tempfile.mkdtemp(prefix="todo-bench-")
+    port = free_port()
+    env = {**os.environ, "PYTHONPATH": os.path.join(ROOT, "src"), "DATABASE_URL": f"sqlite:///{tmp}/todo.db",
+           "HASH_WORKERS": "0", "BCRYPT_ROUNDS": str(args.rounds), "HASH_QUEUE_DEPTH": "1000",
+           "LOGIN_USER_MAX_ATTEMPTS": str(args.user_limit if throttle else 0),
+           "LOGIN_IP_MAX_ATTEMPTS": str(args.ip_limit if throttle else 0)}
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "todo.backend.main:app", "--port", str(port),
+                               "--log-level", "warning", "--no-access-log",
+                               "--timeout-keep-alive", "30", "--proxy-headers", "--forwarded-allow-ips", "*"],
+                              env=env, cwd=tmp)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def login(client, username, password, ip) -> int | str:
+    try:
+        resp = await client.post("/auth/login", data={"username": username, "password": password},
+                                 headers={"X-Forwarded-For": ip})
+    except httpx.TransportError as exc:
+        return type(exc).__name__
+    return resp.status_code
+
+
+async def attacker(client, index, args, usernames, deadline, statuses):
+    ip = f"10.0.{index % args.attack_ips // 256}.{index % args.attack_ips % 256}"
+    while time.perf_counter() < deadline:
+        code = await login(client, random.choice(usernames), "wrong-password", ip)
+        statuses[code] = statuses.get(code, 0) + 1
+
+
+async def legitimate(client, args, deadline, samples, statuses):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        code = await login(client, "legit", PASSWORD, LEGIT_IP)
+        samples.append(time.perf_counter() - start)
+        statuses[code] = statuses.get(code, 0) + 1
+        await asyncio.sleep(max(0.0, args.interval - (time.perf_counter() - start)))
+
+
+async def phase(client, server, args, attackers, usernames):
+    samples, legit_statuses, attack_statuses = [], {}, {}
+    cpu, start = cpu_seconds(server.pid), time.perf_counter()
+    deadline = start + args.seconds
+    await asyncio.gather(legitimate(client, args, deadline, samples, legit_statuses),
+                         *(attacker(client, i, args, usernames, deadline, attack_statuses) for i in range(attackers)))
+    elapsed = time.perf_counter() - start
+    return {"server_cpu_percent": round((cpu_seconds(server.pid) - cpu) / elapsed * 100, 1),
+            "attack": {"requests_per_sec": round(sum(attack_statuses.values()) / elapsed, 1),
+                       "statuses": attack_statuses},
+            "legit": {"statuses": legit_statuses, **summarize(samples)}}
+
+
+async def run(url, server, args):
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=url, timeout=None, limits=limits) as client:
+        await wait_for_server(client)
+        existing = [f"user-{i}" for i in range(args.users)]
+        for username in ["legit", *existing]:
+            await client.post("/auth/signup", json={"username": username, "password": PASSWORD})
+        usernames = existing + [f"unknown-{i}" for i in range(args.users)]
+        return {"baseline": await phase(client, server, args, 0, usernames),
+                "attack": await phase(client, server, args, args.attackers, usernames)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--attackers", type=int, default=32, help="concurrent attack loops")
+    parser.add_argument("--attack-ips", type=int, default=4)
+    parser.add_argument("--users", type=int, default=50, help="existing (and as many unknown) usernames attacked")
+    parser.add_argument("--ip-limit", type=int, default=10, help="failed attempts per IP per window")
+    parser.add_argument("--user-limit", type=int, default=5, help="failed attempts per username per window")
+    parser.add_argument("--rounds", type=int, default=10, help="BCRYPT_ROUNDS")
+    parser.add_argument("--interval", type=float, default=0.25, help="seconds between legitimate logins")
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    results = {"attackers": args.attackers, "attack_ips": args.attack_ips, "ip_limit": args.ip_limit,
+               "user_limit": args.user_limit, "bcrypt_rounds": args.rounds,
+               "cpus": os.cpu_count()}
+    for throttle in (False, True):
+        server, url = start_server(args, throttle)
+        try:
+            results["throttle_on" if throttle else "throttle_off"] = asyncio.run(run(url, server, args))
+        finally:
+            server.kill()
+            server.wait()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Custo de renderização da lista de tasks do frontend Flet (sem navegador e sem rede).
+
+Mede, por operação, os bytes que o Flet enviaria ao navegador (lotes PAGE_CONTROLS_BATCH
+serializados como no protocolo) e o tempo de CPU no processo do app:
+
+  initial      montagem da tela com N tasks
+  toggle-one   marcar uma task como concluída
+  edit-one     renomear uma task
+  delete-one   excluir uma task
+  event-one    alteração de uma task chegando pelo canal de eventos
+  scroll       rolar até o fim de SCROLL páginas seguidas (carrega uma página, descarta outra)
+
+e, ao final, os controles de linha montados. --memory mede também a memória alocada pelo
+app (tracemalloc; deixa os tempos várias vezes mais lentos).
+
+--full-rebuild descarta as linhas antes de cada operação (equivale à reconstrução completa
+da lista, o comportamento anterior).
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import common  # noqa: F401  (coloca src/ no sys.path)
+import flet as ft
+import httpx
+from flet.core.local_connection import LocalConnection
+from flet.core.protocol import (ClientActions, ClientMessage, CommandEncoder,
+                                PageCommandsBatchResponsePayload)
+
+from todo.frontend.app import ROW_HEIGHT, ToDoApp
+
+
+class MeasuringConnection(LocalConnection):
+    def __init__(self):
+        super().__init__()
+        self.sent = 0
+
+    def send_commands(self, session_id, commands):
+        results, messages = [], []
+        for command in commands:
+            result, message = self._process_command(command)
+            if command.name in ("add", "get"):
+                results.append(result)
+            if message:
+                messages.append(message)
+        if messages:
+            payload = ClientMessage(ClientActions.PAGE_CONTROLS_BATCH, messages)
+            self.sent += len(json.dumps(payload, cls=CommandEncoder, separators=(",", ":")))
+        return PageCommandsBatchResponsePayload(results=results, error="")
+
+
+def make_tasks(count):
+    return [{"id": i, "name": f"task {i}", "status": "incomplete",
+             "created_at": f"2026-01-01T00:00:{i:08d}", "updated_at": None}
+            for i in range(1, count + 1)]
+
+
+class OfflineApi:
+    # Responde como a API (páginas por cursor, contagens), sem rede: isola o custo do frontend
+    def __init__(self, count):
+        self.tasks = make_tasks(count)
+
+    def set_token(self, token):
+        pass
+
+    async def get(self, url, params=None, **kwargs):
+        request = httpx.Request("GET", url)
+        if url == "/users/me":
+            return httpx.Response(200, json={"id": 1, "username": "bench"}, request=request)
+        if url == "/tasks/stats":
+            complete = sum(1 for t in self.tasks if t["status"] == "complete")
+            return httpx.Response(200, json={"total": len(self.tasks), "complete": complete,
+                                             "incomplete": len(self.tasks) - complete}, request=request)
+        start = int(params.get("cursor", 0))
+        tasks = [t for t in self.tasks if t["status"] == params["status"]] if "status" in params else self.tasks
+        page = tasks[start:start + params["limit"]]
+        headers = {"X-Sync-Token": "1"}
+        if start + params["limit"] < len(tasks):
+            headers["X-Next-Cursor"] = str(start + params["limit"])
+        return httpx.Response(200, json=page, headers=headers, request=request)
+
+    async def put(self, url, **kwargs):
+        return httpx.Response(200, json={})
+
+    async def delete(self, url, **kwargs):
+        return httpx.Response(200, json={})
+
+    def stream(self, *args, **kwargs):
+        raise httpx.ConnectError("offline")
+
+
+async def run(count, scroll, full_rebuild, memory):
+    api = OfflineApi(count)
+    if memory:
+        # memória do app, sem as tasks do "servidor"
+        tracemalloc.start()
+    conn = MeasuringConnection()
+    page = ft.Page(conn, "bench", asyncio.get_running_loop())
+    app = ToDoApp(page)
+    app.api = api
+    results = {}
+
+    async def measure(name, action):
+        if full_rebuild:
+            app.rows = {}
+        conn.sent = 0
+        start = time.perf_counter()
+        await action()
+        results[name] = {"bytes": conn.sent, "ms": round((time.perf_counter() - start) * 1000, 1)}
+
+    async def initial():
+        await app.load_todo_view()
+        app.events_task.cancel()
+        # o que muda chegaria pelo canal de eventos: after_write não busca o delta
+        app.events_connected = True
+
+    async def toggle_one():
+        await app.toggle_status(SimpleNamespace(control=SimpleNamespace(value=True)), app.tasks[4])
+
+    async def edit_one():
+        await app.edit_task(app.tasks[5]["id"], "renomeada")
+
+    async def delete_one():
+        await app.delete_task(app.tasks[6]["id"])
+
+    async def event_one():
+        task = {**app.tasks[7], "name": "alterada em outra sessão"}
+        await app.apply_event({"token": app.sync_token + 1, "reset": False, "tasks": [task], "deleted": []})
+
+    async def scroll_pages():
+        for _ in range(scroll):
+            extent = len(app.tasks) * ROW_HEIGHT
+            event = SimpleNamespace(pixels=extent, max_scroll_extent=extent)
+            await app.on_scroll(event)
+
+    await measure("initial", initial)
+    await measure("toggle-one", toggle_one)
+    await measure("edit-one", edit_one)
+    await measure("delete-one", delete_one)
+    await measure("event-one", event_one)
+    if scroll:
+        await measure("scroll", scroll_pages)
+        results["scroll"]["ms_per_page"] = round(results["scroll"]["ms"] / scroll, 1)
+    results["rows_mounted"] = len(app.rows)
+    if memory:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results["memory_mb"] = round(current / 1e6, 1)
+        results["peak_memory_mb"] = round(peak / 1e6, 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--scroll", type=int, default=20)
+    parser.add_argument("--full-rebuild", action="store_true")
+    parser.add_argument("--memory", action="store_true")
+    args = parser.parse_args()
+    print(json.dumps({n: asyncio.run(run(n, args.scroll, args.full_rebuild, args.memory)) for n in args.tasks},
+                     indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Task name search: FTS5 (bm25, prefix) vs. a LIKE '%term%' baseline.
+
+    python benchmarks/bench_search.py --tasks 100000 1000000
+"""
+import argparse
+import json
+import random
+import time
+
+from common import database, use_temp_database, summarize
+
+use_temp_database()
+
+from sqlalchemy import delete, insert, select  # noqa: E402
+from todo.backend import crud, migrations, models  # noqa: E402
+
+USERS = 10
+VOCABULARY = 5000
+
+
+def make_vocabulary(rng):
+    syllables = ["ba", "ce", "di", "fo", "gu", "la", "me", "ni", "po", "ru", "sa", "te", "vi", "xo", "zu"]
+    words = set()
+    while len(words) < VOCABULARY:
+        words.add("".join(rng.choices(syllables, k=rng.randint(2, 4))))
+    return sorted(words)
+
+
+def seed(count):
+    rng = random.Random(42)
+    words = make_vocabulary(rng)
+    # Frequência tipo Zipf: poucas palavras comuns, muitas raras
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    with database().SessionLocal() as db:
+        db.execute(delete(models.Task))
+        for offset in range(0, count, 10_000):
+            rows = [{"name": " ".join(rng.choices(words, weights, k=4)), "owner_id": 1 + i % USERS}
+                    for i in range(offset, min(count, offset + 10_000))]
+            db.execute(insert(models.Task), rows)
+        db.commit()
+    return words
+
+
+def like_select(owner_id, term):
+    return (select(models.Task)
+            .filter(models.Task.owner_id == owner_id, models.Task.name.like(f"%{term}%"))
+            .order_by(models.Task.created_at, models.Task.id))
+
+
+def timed(db, stmt, rounds):
+    samples, rows = [], 0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        rows = len(db.scalars(stmt).all())
+        samples.append(time.perf_counter() - start)
+    return {"rows": rows, **summarize(samples)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--word-rank", type=int, default=200,
+                        help="search for the word at this frequency rank (0 = most common)")
+    args = parser.parse_args()
+
+    migrations.migrate(database().engine)
+    results = []
+    for count in args.tasks:
+        term = seed(count)[args.word_rank]
+        with database().SessionLocal() as db:
+            fts = crud.search_select(1, term, None, "sqlite")
+            like = like_select(1, term)
+            results.append({
+                "tasks": count,
+                "term": term,
+                "fts_first_page": timed(db, fts.limit(50), args.rounds),
+                "like_first_page": timed(db, like.limit(50), args.rounds),
+                "fts_all_matches": timed(db, fts, args.rounds),
+                "like_all_matches": timed(db, like, args.rounds),
+            })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
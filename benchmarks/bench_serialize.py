@@ -0,0 +1,80 @@
+"""Serialization cost of a task list: ORM objects + response_model validation + stdlib json
+(the previous path of GET /tasks/) vs. column tuples + orjson (crud.task_rows / json_response).
+
+  query    load the rows from SQLite (ORM objects vs. tuples)
+  encode   turn them into the response body
+  request  GET /tasks/ end to end through the ASGI app
+"""
+import argparse
+import json
+import time
+from typing import List
+
+from common import database, use_temp_database, seed_tasks, signup_and_login, summarize
+
+use_temp_database()
+
+from fastapi import Response  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from todo.backend import crud, schemas  # noqa: E402
+from todo.backend.main import app  # noqa: E402
+
+tasks_adapter = TypeAdapter(List[schemas.Task])
+
+
+def pydantic_encode(tasks):
+    # O que o FastAPI faz com o response_model: valida, serializa em modo json e usa o json da stdlib
+    content = tasks_adapter.dump_python(tasks_adapter.validate_python(tasks), mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def fast_encode(rows):
+    return crud.json_response(crud.task_dicts(rows), Response()).body
+
+
+def timed(fn, rounds):
+    samples, result = [], None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return result, summarize(samples)
+
+
+def run(client, args):
+    headers = signup_and_login(client, "bench")
+    user_id = client.get("/users/me", headers=headers).json()["id"]
+    seed_tasks(user_id, args.tasks)
+    stmt = crud.tasks_select(user_id)
+
+    with database().SessionLocal() as db:
+        tasks, orm_query = timed(lambda: db.scalars(stmt).all(), args.rounds)
+        rows, tuple_query = timed(lambda: db.execute(crud.task_rows(stmt)).all(), args.rounds)
+        old_body, orm_encode = timed(lambda: pydantic_encode(tasks), args.rounds)
+        new_body, fast_encode_stats = timed(lambda: fast_encode(rows), args.rounds)
+    assert json.loads(old_body) == json.loads(new_body)
+
+    response, request = timed(lambda: client.get("/tasks/", headers=headers), args.rounds)
+    results = {
+        "tasks": args.tasks,
+        "bytes": len(new_body),
+        "query": {"orm": orm_query, "tuples": tuple_query},
+        "encode": {"pydantic_json": orm_encode, "orjson": fast_encode_stats},
+        "request": {"status": response.status_code, **request},
+    }
+    print(json.dumps(results, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    with TestClient(app) as client:
+        run(client, args)
+
+
+if __name__ == "__main__":
+    main()
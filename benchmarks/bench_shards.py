@@ -0,0 +1,103 @@
+"""Write throughput with the tasks split over SQLite shards (SHARDS=N), multi-worker uvicorn.
+
+For each --shards count a fresh database (directory + N shard files, or one file for 0) is
+served by `uvicorn --workers W`; --users users are created and --concurrency client loops
+POST /tasks/ for --seconds, each loop cycling over the users. Reports req/s, p50/p99 and
+errors per shard count. With one database every write of every worker waits on the same
+SQLite write lock; with N shards writes of users on different shards commit in parallel, so
+the gain is bounded by the CPU cores available to the workers.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from common import ROOT, free_port, summarize, wait_for_server
+
+PASSWORD = "bench-password"
+
+
+def start_server(shards, workers):
+    tmp = tempfile.mkdtemp(prefix="todo-bench-")
+    port = free_port()
+    env = {**os.environ, "PYTHONPATH": os.path.join(ROOT, "src"), "DATABASE_URL": f"sqlite:///{tmp}/todo.db",
+           "SHARDS": str(shards), "SHARD_URL": f"sqlite:///{tmp}/shard-{{shard}}.db",
+           "HASH_WORKERS": "0", "BCRYPT_ROUNDS": "4", "ARCHIVE_INTERVAL_SECONDS": "0"}
+    # Grupo próprio: com --workers, matar só o supervisor deixa os workers órfãos
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "todo.backend.main:app", "--port", str(port),
+                               "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+                               "--timeout-keep-alive", "30"],
+                              env=env, cwd=tmp, start_new_session=True)
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def create_users(client, count):
+    users = []
+    for i in range(count):
+        username = f"bench-{i}"
+        await client.post("/auth/signup", json={"username": username, "password": PASSWORD})
+        resp = await client.post("/auth/login", data={"username": username, "password": PASSWORD})
+        users.append({"Authorization": f"Bearer {resp.json()['access_token']}"})
+    return users
+
+
+async def client_loop(client, users, deadline, samples, errors):
+    i = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        i += 1
+        try:
+            resp = await client.post("/tasks/", headers=users[i % len(users)], json={"name": "shard bench"})
+        except httpx.TransportError as exc:
+            errors[type(exc).__name__] = errors.get(type(exc).__name__, 0) + 1
+            continue
+        samples.append(time.perf_counter() - start)
+        if resp.status_code != 200:
+            errors[resp.status_code] = errors.get(resp.status_code, 0) + 1
+
+
+async def measure(url, args):
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=url, timeout=None, limits=limits) as client:
+        await wait_for_server(client)
+        users = await create_users(client, args.users)
+        samples, errors = [], {}
+        start = time.perf_counter()
+        # Cada loop começa por um usuário diferente, espalhando as escritas pelos shards
+        await asyncio.gather(*(client_loop(client, users[i:] + users[:i], start + args.seconds, samples, errors)
+                               for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+    return {"requests": len(samples), "requests_per_sec": round(len(samples) / elapsed, 1),
+            "errors": errors, **summarize(samples)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, nargs="+", default=[0, 2, 4])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--users", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    results = {"workers": args.workers, "users": args.users, "concurrency": args.concurrency,
+               "cpus": os.cpu_count(), "results": []}
+    for shards in args.shards:
+        server, url = start_server(shards, args.workers)
+        try:
+            results["results"].append({"shards": shards, **asyncio.run(measure(url, args))})
+        finally:
+            os.killpg(server.pid, signal.SIGKILL)
+            server.wait()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
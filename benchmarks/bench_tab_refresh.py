@@ -0,0 +1,58 @@
+"""Bytes and latency of one frontend tab refresh: 4 list GETs vs. list + embedded stats."""
+import argparse
+import json
+import time
+
+from common import use_temp_database, seed_tasks, signup_and_login, summarize
+
+use_temp_database()
+
+from fastapi.testclient import TestClient  # noqa: E402
+from todo.backend.main import app  # noqa: E402
+
+
+def old_refresh(client, headers):
+    responses = [
+        client.get("/tasks/", headers=headers),
+        client.get("/tasks/", headers=headers),
+        client.get("/tasks/", headers=headers, params={"status": "incomplete"}),
+        client.get("/tasks/", headers=headers, params={"status": "complete"}),
+    ]
+    return sum(len(r.content) for r in responses)
+
+
+def new_refresh(client, headers):
+    resp = client.get("/tasks/", headers=headers, params={"with_stats": True})
+    return len(resp.content) + len(resp.headers["X-Task-Stats"])
+
+
+def measure(fn, client, headers, rounds):
+    samples, size = [], 0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        size = fn(client, headers)
+        samples.append(time.perf_counter() - start)
+    return {"bytes": size, **summarize(samples)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    with TestClient(app) as client:
+        headers = signup_and_login(client, "bench")
+        user_id = client.get("/users/me", headers=headers).json()["id"]
+        seed_tasks(user_id, args.tasks)
+
+        results = {
+            "tasks": args.tasks,
+            "four_requests": measure(old_refresh, client, headers, args.rounds),
+            "with_stats": measure(new_refresh, client, headers, args.rounds),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Task write throughput (POST /tasks/) with 1, 8 and 64 concurrent writers.
+
+Each configuration runs in its own process and database:
+  rollback-journal  SQLITE_WAL=false GROUP_COMMIT=false (previous behaviour)
+  wal               SQLITE_WAL=true  GROUP_COMMIT=false
+  wal+group-commit  SQLITE_WAL=true  GROUP_COMMIT=true
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+CONFIGS = {
+    "rollback-journal": {"SQLITE_WAL": "false", "GROUP_COMMIT": "false"},
+    "wal": {"SQLITE_WAL": "true", "GROUP_COMMIT": "false"},
+    "wal+group-commit": {"SQLITE_WAL": "true", "GROUP_COMMIT": "true"},
+}
+
+
+def run_single(writers, seconds):
+    import asyncio
+    import time
+
+    from common import asgi_client, use_temp_database, summarize
+    use_temp_database()
+
+    from todo.backend.main import app
+
+    async def writer(client, headers, deadline, samples, errors):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            resp = await client.post("/tasks/", headers=headers, json={"name": "bench"})
+            samples.append(time.perf_counter() - start)
+            if resp.status_code != 200:
+                errors[resp.status_code] = errors.get(resp.status_code, 0) + 1
+
+    async def run():
+        async with asgi_client(app, raise_app_exceptions=False) as client:
+            await client.post("/auth/signup", json={"username": "bench", "password": "bench-password"})
+            resp = await client.post("/auth/login", data={"username": "bench", "password": "bench-password"})
+            headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+            samples, errors = [], {}
+            start = time.perf_counter()
+            await asyncio.gather(*(writer(client, headers, start + seconds, samples, errors)
+                                   for _ in range(writers)))
+            elapsed = time.perf_counter() - start
+        return {"writers": writers, "writes_per_sec": round(len(samples) / elapsed, 1),
+                "errors": errors, **summarize(samples)}
+
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args.writers[0], args.seconds)))
+        return
+
+    results = {}
+    for name, env in CONFIGS.items():
+        results[name] = []
+        for writers in args.writers:
+            out = subprocess.run(
+                [sys.executable, __file__, "--single", "--writers", str(writers), "--seconds", str(args.seconds)],
+                env={**os.environ, **env}, capture_output=True, text=True, check=True,
+            )
+            results[name].append(json.loads(out.stdout.strip().splitlines()[-1]))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import asyncio
+import contextlib
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+
+def use_temp_database():
+    # Precisa rodar antes de importar todo.backend: as configurações leem DATABASE_URL no import
+    tmp = tempfile.mkdtemp(prefix="todo-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/todo.db"
+    return tmp
+
+
+_database = None
+
+def database():
+    # Acesso direto ao banco (semente, consultas), fora das instâncias do app
+    global _database
+    if _database is None:
+        from todo.backend import settings
+        from todo.backend.database import Database
+        _database = Database(settings)
+    return _database
+
+
+@contextlib.asynccontextmanager
+async def asgi_client(app, **transport_options):
+    # httpx.ASGITransport não roda o lifespan (banco, migrações): entra nele aqui
+    import httpx
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app, **transport_options)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            yield client
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_uvicorn(cwd, env=None, *args):
+    # Servidor real num subprocesso, com o banco temporário (DATABASE_URL do ambiente).
+    # Encerrar com kill(): o shutdown gracioso do uvicorn espera as conexões SSE fecharem
+    port = free_port()
+    env = {**os.environ, "PYTHONPATH": os.path.join(ROOT, "src"), **(env or {})}
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "todo.backend.main:app", "--port", str(port),
+                               "--log-level", "warning", *args], env=env, cwd=cwd)
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def wait_for_server(client, attempts=100):
+    import httpx
+
+    for _ in range(attempts):
+        try:
+            await client.get("/docs")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+    }
+
+
+def signup_and_login(client, username, password="bench-password"):
+    client.post("/auth/signup", json={"username": username, "password": password})
+    resp = client.post("/auth/login", data={"username": username, "password": password})
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+def seed_tasks(owner_id, count, complete_ratio=0.5):
+    from sqlalchemy import insert
+    from todo.backend import models
+
+    start = datetime.utcnow() - timedelta(seconds=count)
+    rows = [
+        {
+            "name": f"task {i}",
+            # complete_ratio das tasks concluídas, espalhadas pela lista
+            "status": "complete" if int((i + 1) * complete_ratio) > int(i * complete_ratio) else "incomplete",
+            "created_at": start + timedelta(seconds=i),
+            "owner_id": owner_id,
+        }
+        for i in range(count)
+    ]
+    with database().SessionLocal() as db:
+        for offset in range(0, count, 10_000):
+            db.execute(insert(models.Task), rows[offset:offset + 10_000])
+        db.commit()
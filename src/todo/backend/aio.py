@@ -0,0 +1,144 @@
+import asyncio
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from . import models, schemas, crud
+from .auth import (oauth2_scheme, credentials_select, password_hash_update,
+                   decode_token, cache_user, log_in, sign_up)
+from .database import database_of, get_async_db, store_of
+from .metrics import token_cache_lookups
+from .settings import TASKS_PAGE_MAX
+
+# Versões assíncronas (AsyncSession) das rotas de auth, tasks e usuário, ativadas por ASYNC_DB.
+# Mesmos caminhos e contratos das rotas síncronas em main.py / auth.py; as rotas que não
+# estão aqui (batch etc.) continuam atendidas pelas versões síncronas.
+router = APIRouter()
+
+async def run_write(db: AsyncSession, fn, *args):
+    write_queue = store_of(db).write_queue
+    if write_queue is not None:
+        return await asyncio.wrap_future(write_queue.submit(fn, *args))
+    result = await db.run_sync(fn, *args)
+    await db.commit()
+    return result
+
+# ---------- AUTH ----------
+async def find_credentials(db: AsyncSession, username: str):
+    row = (await db.execute(credentials_select(username))).first()
+    await db.rollback()
+    return row
+
+async def get_current_user(db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)):
+    user = database_of(db).token_cache.get(token)
+    token_cache_lookups.inc("miss" if user is None else "hit")
+    if user is None:
+        payload = decode_token(token)
+        user_id = payload.get("uid")
+        if user_id is not None:
+            found = await db.get(models.User, user_id)
+        else:
+            found = await find_credentials(db, payload["sub"])
+        user = cache_user(db, token, payload, found)
+    database = database_of(db)
+    if database.shards:
+        # Shard fora do cache (primeira requisição ou expirado): lido do diretório, fora do loop
+        if database.cached_shard(user.id) is None:
+            await run_in_threadpool(database.shard_of, user.id)
+        database.route(db.sync_session, user.id)
+    return user
+
+async def save_user(db: AsyncSession, user: models.User):
+    db.add(user)
+    await db.flush()
+    database_of(db).assign_shard(user)
+    await db.commit()
+    return user
+
+async def update_password_hash(db: AsyncSession, user_id: int, hashed_password: str):
+    await db.execute(password_hash_update(user_id, hashed_password))
+    await db.commit()
+
+@router.post("/auth/signup", response_model=schemas.User)
+async def signup(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    return await sign_up(user, database_of(db), lambda username: find_credentials(db, username),
+                         lambda new_user: save_user(db, new_user))
+
+@router.post("/auth/login", response_model=schemas.Token)
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(),
+                db: AsyncSession = Depends(get_async_db)):
+    return await log_in(request, form_data, database_of(db), lambda username: find_credentials(db, username),
+                        lambda user_id, hashed: update_password_hash(db, user_id, hashed))
+
+# -------- TASKS --------
+async def current_version(db: AsyncSession, owner_id: int) -> int:
+    return (await db.scalar(crud.version_select(owner_id))) or 0
+
+@router.post("/tasks/", response_model=schemas.Task)
+async def create_task(task: schemas.TaskCreate, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(get_current_user)):
+    return await run_write(db, crud.create_task, current_user.id, task.name)
+
+@router.get("/tasks/", response_model=List[schemas.Task])
+async def read_tasks(response: Response,
+                     status: str | None = None,
+                     q: str | None = Query(None, min_length=1, max_length=200),
+                     limit: int | None = Query(None, ge=1, le=TASKS_PAGE_MAX),
+                     cursor: str | None = None,
+                     stream: bool = False,
+                     with_stats: bool = False,
+                     include_archived: bool = False,
+                     if_none_match: str | None = Header(None),
+                     db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(get_current_user)):
+    listing = crud.TaskListing(current_user.id, status, q, limit, cursor, include_archived, stream,
+                               db.bind.dialect.name)
+    version = await current_version(db, current_user.id)
+    not_modified = crud.not_modified(response, current_user.id, version, if_none_match)
+    if not_modified is not None:
+        return not_modified
+    response.headers["X-Sync-Token"] = str(version)
+
+    if with_stats:
+        rows = (await db.execute(crud.stats_select(current_user.id))).all()
+        response.headers["X-Task-Stats"] = crud.stats_from_rows(rows).model_dump_json()
+
+    if listing.stream:
+        return listing.streaming(store_of(db).SessionLocal, response)
+    return listing.page(await db.execute(listing.stmt), response)
+
+@router.get("/tasks/changes", response_model=schemas.TaskChanges)
+async def read_task_changes(response: Response, since: int = 0, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(get_current_user)):
+    version, purged_version = (await db.execute(crud.sync_state_select(current_user.id))).first() or (0, 0)
+    reset = crud.needs_reset(since, version, purged_version)
+    stmt = crud.tasks_select(current_user.id) if reset else crud.changes_select(current_user.id, since)
+    rows = (await db.execute(crud.changes_rows(stmt))).all()
+    archived = () if reset else (await db.scalars(crud.archived_since_select(current_user.id, since))).all()
+    return crud.json_response(crud.build_changes(version, reset, rows, archived), response)
+
+@router.get("/tasks/stats", response_model=schemas.TaskStats)
+async def read_task_stats(response: Response, if_none_match: str | None = Header(None), db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(get_current_user)):
+    version = await current_version(db, current_user.id)
+    not_modified = crud.not_modified(response, current_user.id, version, if_none_match)
+    if not_modified is not None:
+        return not_modified
+    rows = (await db.execute(crud.stats_select(current_user.id))).all()
+    return crud.stats_from_rows(rows)
+
+@router.put("/tasks/{task_id:int}", response_model=schemas.Task)
+async def update_task(task_id: int, task_update: schemas.TaskUpdate, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(get_current_user)):
+    task = await run_write(db, crud.update_task, task_id, current_user.id, task_update)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+@router.delete("/tasks/{task_id:int}")
+async def delete_task(task_id: int, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(get_current_user)):
+    if not await run_write(db, crud.delete_task, task_id, current_user.id):
+        raise HTTPException(status_code=404, detail="Task not found")
+    return {"detail": "Task deleted successfully"}
+
+# --- USER ROUTES ---
+@router.get("/users/me", response_model=schemas.User)
+async def read_users_me(current_user: schemas.User = Depends(get_current_user)):
+    return current_user
@@ -1,90 +1,159 @@
 from datetime import datetime, timedelta
-from fastapi import Depends, HTTPException, status, APIRouter
+from fastapi import Depends, HTTPException, Request, status, APIRouter
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
-from jose import JWTError, jwt
+from starlette.concurrency import run_in_threadpool
 
 from . import models, schemas
-from .database import SessionLocal
+from .database import database_of, get_db
+from .hashing import HashingPool, pwd_context, hash_password, verify_and_update, verify_dummy
+from .metrics import auth_duration, token_cache_lookups, timed
 
 from .settings import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-# ---------- DB DEPENDENCY ----------
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # ---------- UTILS ----------
 def verify_password(plain, hashed):
-    return pwd_context.verify(plain, hashed)
+    return pwd_context().verify(plain, hashed)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
 
+# python-jose (e o backend de criptografia) é importado no primeiro uso, não no import do app
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
+    from jose import jwt
+
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+def issue_token(user) -> dict:
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    token = create_access_token(data={"sub": user.username, "uid": user.id}, expires_delta=access_token_expires)
+    return {"access_token": token, "token_type": "bearer"}
+
 def get_user(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = get_user(db, username)
-    if not user or not verify_password(password, user.hashed_password):
-        return False
+def credentials_select(username: str):
+    return (select(models.User.id, models.User.username, models.User.hashed_password)
+            .filter(models.User.username == username))
+
+def find_credentials(db: Session, username: str):
+    # Só as colunas necessárias, e encerra a transação: a conexão volta ao pool
+    # em vez de ficar presa enquanto o bcrypt roda
+    row = db.execute(credentials_select(username)).first()
+    db.rollback()
+    return row
+
+def save_user(db: Session, user: models.User):
+    db.add(user)
+    db.flush()
+    database_of(db).assign_shard(user)
+    db.commit()
+    db.refresh(user)
     return user
 
+def password_hash_update(user_id: int, hashed_password: str):
+    return update(models.User).filter(models.User.id == user_id).values(hashed_password=hashed_password)
+
+def update_password_hash(db: Session, user_id: int, hashed_password: str):
+    db.execute(password_hash_update(user_id, hashed_password))
+    db.commit()
+
+# ---------- LOGIN / CADASTRO ----------
+# Mesmo fluxo nas rotas síncronas (abaixo) e assíncronas (aio.py): cada uma passa só o acesso
+# ao banco da sua sessão (find_credentials, update_password_hash, save_user)
+def login_error():
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                         detail="Incorrect username or password",
+                         headers={"WWW-Authenticate": "Bearer"})
+
+async def check_password(hashing_pool: HashingPool, user, password: str) -> str | None:
+    # Usuário inexistente confere contra um hash fixo: mesmo tempo de resposta.
+    # Devolve o hash novo quando BCRYPT_ROUNDS mudou
+    with timed(auth_duration, "bcrypt_verify"):
+        if user:
+            verified, new_hash = await hashing_pool.run(verify_and_update, password, user.hashed_password)
+        else:
+            verified, new_hash = await hashing_pool.run(verify_dummy, password)
+    if not verified:
+        raise login_error()
+    return new_hash
+
+async def log_in(request: Request, form_data: OAuth2PasswordRequestForm, database,
+                 find_credentials, update_password_hash) -> dict:
+    # Limite de tentativas antes de qualquer consulta ou hash (429 com Retry-After)
+    async with database.login_throttle.attempt(form_data.username, client_ip(request)):
+        user = await find_credentials(form_data.username)
+        new_hash = await check_password(database.hashing_pool, user, form_data.password)
+        if new_hash:
+            # BCRYPT_ROUNDS mudou: regrava o hash com o custo atual
+            await update_password_hash(user.id, new_hash)
+    return issue_token(user)
+
+async def sign_up(user: schemas.UserCreate, database, find_credentials, save_user):
+    if await find_credentials(user.username):
+        raise HTTPException(status_code=400, detail="Username already registered")
+    with timed(auth_duration, "bcrypt_hash"):
+        hashed_pw = await database.hashing_pool.run(hash_password, user.password)
+    return await save_user(models.User(username=user.username, hashed_password=hashed_pw))
+
 # ---------- ROUTES ----------
+# bcrypt roda no pool da instância (Database.hashing_pool); as consultas ao banco vão para o threadpool
 @router.post("/signup", response_model=schemas.User)
-def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = get_user(db, user.username)
-    if db_user:
-        raise HTTPException(status_code=400, detail="Username already registered")
-    
-    hashed_pw = get_password_hash(user.password)
-    new_user = models.User(username=user.username, hashed_password=hashed_pw)
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    return new_user
+async def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    return await sign_up(user, database_of(db), lambda username: run_in_threadpool(find_credentials, db, username),
+                         lambda new_user: run_in_threadpool(save_user, db, new_user))
 
 @router.post("/login", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
-                            detail="Incorrect username or password",
-                            headers={"WWW-Authenticate": "Bearer"})
-    
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    token = create_access_token(data={"sub": user.username}, expires_delta=access_token_expires)
-    return {"access_token": token, "token_type": "bearer"}
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    return await log_in(request, form_data, database_of(db),
+                        lambda username: run_in_threadpool(find_credentials, db, username),
+                        lambda user_id, hashed: run_in_threadpool(update_password_hash, db, user_id, hashed))
+
+def client_ip(request: Request) -> str | None:
+    # Atrás de proxy, o uvicorn precisa de --proxy-headers/--forwarded-allow-ips para o IP real
+    return request.client.host if request.client else None
+
+def credentials_error():
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                         detail="Could not validate credentials",
+                         headers={"WWW-Authenticate": "Bearer"})
+
+def decode_token(token: str) -> dict:
+    from jose import JWTError, jwt
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
-                                          detail="Could not validate credentials",
-                                          headers={"WWW-Authenticate": "Bearer"})
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
+        with timed(auth_duration, "jwt_decode"):
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
-        raise credentials_exception
+        raise credentials_error()
+    if payload.get("sub") is None:
+        raise credentials_error()
+    return payload
 
-    user = get_user(db, username)
+def cache_user(db: Session, token: str, payload: dict, user: models.User | None) -> schemas.User:
+    if user is None or user.username != payload["sub"]:
+        raise credentials_error()
+    snapshot = schemas.User(id=user.id, username=user.username)
+    database_of(db).token_cache.set(token, payload, snapshot)
+    return snapshot
+
+def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+    user = database_of(db).token_cache.get(token)
+    token_cache_lookups.inc("miss" if user is None else "hit")
     if user is None:
-        raise credentials_exception
+        payload = decode_token(token)
+        # Tokens novos trazem o id: busca pela chave primária em vez do username
+        user_id = payload.get("uid")
+        found = db.get(models.User, user_id) if user_id is not None else get_user(db, payload["sub"])
+        user = cache_user(db, token, payload, found)
+    # Modo SHARDS: o resto da requisição usa o shard do usuário
+    database_of(db).route(db, user.id)
     return user
-
@@ -0,0 +1,625 @@
+import base64
+import csv
+import io
+from collections import deque
+import orjson
+from datetime import datetime, timezone
+from fastapi import HTTPException, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import (column, delete, func, insert, literal, literal_column, select, table, text, tuple_,
+                        union_all, update)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .events import queue_event
+from .settings import STREAM_CHUNK_SIZE, TASKS_IMPORT_ROW_MAX_BYTES
+
+# Consultas compartilhadas entre as rotas síncronas (main.py) e assíncronas (aio.py)
+
+# -------- PAGINAÇÃO --------
+# Cursor opaco sobre (created_at, id), a mesma ordem usada na listagem.
+def encode_cursor(task: models.Task) -> str:
+    raw = f"{task.created_at.isoformat()}|{task.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, task_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(task_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# Na busca a ordem é por relevância, então o cursor guarda só o deslocamento
+def encode_offset_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(f"offset|{offset}".encode()).decode()
+
+def decode_offset_cursor(cursor: str) -> int:
+    try:
+        prefix, offset = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        if prefix != "offset":
+            raise ValueError(prefix)
+        return int(offset)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# -------- VERSÃO / ETAG --------
+def version_select(owner_id: int):
+    return select(models.TaskVersion.version).filter(models.TaskVersion.owner_id == owner_id)
+
+def get_version(db: Session, owner_id: int) -> int:
+    return db.scalar(version_select(owner_id)) or 0
+
+# Upsert em uma instrução (INSERT ... ON CONFLICT DO UPDATE ... RETURNING, SQLite e Postgres):
+# sem o writer, duas primeiras escritas concorrentes do usuário não tentam criar a linha as duas
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+def version_upsert(owner_id: int, dialect: str):
+    stmt = UPSERT_INSERTS[dialect](models.TaskVersion).values(owner_id=owner_id, version=1)
+    return (stmt.on_conflict_do_update(index_elements=[models.TaskVersion.owner_id],
+                                       set_={"version": models.TaskVersion.version + 1})
+            .returning(models.TaskVersion.version))
+
+def bump_version(db: Session, owner_id: int) -> int:
+    dialect = db.get_bind(models.TaskVersion).dialect.name
+    return db.scalar(version_upsert(owner_id, dialect).execution_options(synchronize_session=False))
+
+def make_etag(owner_id: int, version: int) -> str:
+    return f'W/"{owner_id}.{version}"'
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    return any(tag.strip() in (etag, "*") for tag in if_none_match.split(","))
+
+def not_modified(response: Response, owner_id: int, version: int, if_none_match: str | None) -> Response | None:
+    # 304 se o cliente já tem a versão; senão deixa o ETag na resposta da rota
+    etag = make_etag(owner_id, version)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return None
+
+# -------- SERIALIZAÇÃO --------
+# Caminho rápido das listagens: só as colunas de schemas.Task, em tuplas, codificadas direto com
+# orjson, sem montar objetos ORM nem validar linha a linha com Pydantic. O JSON sai igual ao do
+# response_model (mesmos campos, ordem e formato de data), que segue documentando a rota.
+TASK_FIELDS = tuple(schemas.Task.model_fields)
+
+def task_rows(stmt):
+    return stmt.with_only_columns(*(getattr(models.Task, field) for field in TASK_FIELDS))
+
+def task_dicts(rows) -> list[dict]:
+    return [dict(zip(TASK_FIELDS, row)) for row in rows]
+
+def json_response(content, response: Response) -> Response:
+    # Mantém os headers já definidos na rota (ETag, X-Next-Cursor...)
+    return Response(orjson.dumps(content), media_type="application/json", headers=dict(response.headers))
+
+# -------- TASKS --------
+# Tasks removidas ficam como tombstones (deleted_at) até a compactação; as consultas só
+# enxergam as vivas, e a condição bate com a dos índices parciais.
+def alive():
+    return models.Task.deleted_at.is_(None)
+
+def tasks_select(owner_id: int, status: str | None = None, cursor: str | None = None):
+    stmt = select(models.Task).filter(models.Task.owner_id == owner_id, alive())
+    if status:
+        stmt = stmt.filter(models.Task.status == status)
+    if cursor:
+        stmt = stmt.filter(tuple_(models.Task.created_at, models.Task.id) > decode_cursor(cursor))
+    return stmt.order_by(models.Task.created_at, models.Task.id)
+
+# -------- ARQUIVO --------
+# Tasks arquivadas (models.ArchivedTask) só entram na listagem quando pedidas: UNION ALL das
+# duas tabelas, com a mesma ordem e o mesmo cursor por (created_at, id)
+def archived_rows(owner_id: int, status: str | None = None, cursor: str | None = None):
+    archived = models.ArchivedTask
+    stmt = (select(*(getattr(archived, field) for field in TASK_FIELDS))
+            .filter(archived.owner_id == owner_id))
+    if status:
+        stmt = stmt.filter(archived.status == status)
+    if cursor:
+        stmt = stmt.filter(tuple_(archived.created_at, archived.id) > decode_cursor(cursor))
+    return stmt
+
+def listing_rows(owner_id: int, status: str | None = None, cursor: str | None = None,
+                 include_archived: bool = False):
+    # Colunas de schemas.Task, na ordem da listagem (pronto para task_dicts/stream_tasks)
+    stmt = task_rows(tasks_select(owner_id, status, cursor))
+    if not include_archived:
+        return stmt
+    both = union_all(stmt.order_by(None), archived_rows(owner_id, status, cursor)).subquery()
+    return select(*(both.c[field] for field in TASK_FIELDS)).order_by(both.c.created_at, both.c.id)
+
+# O arquivo é só leitura: editar uma task arquivada a devolve para tasks (com versão nova, o
+# delta-sync a entrega de novo) e o arquivador a leva outra vez se continuar concluída. Remover
+# grava o tombstone em tasks com o mesmo id, como as demais remoções
+ARCHIVE_COLUMNS = ("id", "name", "status", "created_at", "updated_at", "owner_id")
+
+def unarchive_tasks(db: Session, owner_id: int, ids) -> int:
+    archived = models.ArchivedTask
+    criteria = (archived.owner_id == owner_id, archived.id.in_(set(ids)))
+    moved = db.execute(insert(models.Task.__table__).from_select(
+        [*ARCHIVE_COLUMNS, "version"],
+        select(*(getattr(archived, c) for c in ARCHIVE_COLUMNS), archived.version).filter(*criteria))).rowcount
+    if moved:
+        db.execute(delete(archived).filter(*criteria))
+    return moved
+
+def delete_archived(db: Session, owner_id: int, criteria, version: int) -> list[int]:
+    archived = models.ArchivedTask
+    criteria = (archived.owner_id == owner_id, *criteria)
+    now = datetime.utcnow()
+    ids = db.scalars(insert(models.Task.__table__).from_select(
+        [*ARCHIVE_COLUMNS, "version", "deleted_at"],
+        select(*(getattr(archived, c) for c in ARCHIVE_COLUMNS), literal(version), literal(now)).filter(*criteria))
+        .returning(models.Task.id)).all()
+    if ids:
+        db.execute(delete(archived).filter(*criteria))
+    return ids
+
+def not_last():
+    # Nunca remove a task de maior id: no SQLite (sem AUTOINCREMENT) o próximo id é max(id) + 1,
+    # e um id já usado por uma task arquivada ou compactada voltaria para uma task nova
+    return models.Task.id < select(func.max(models.Task.id)).scalar_subquery()
+
+def archive_tasks(db: Session, before: datetime, limit: int) -> int:
+    # Um lote do arquivador: copia para tasks_archive e remove de tasks. Cada usuário afetado
+    # ganha uma versão nova e os ids saem das listas dos clientes como removidos
+    rows = db.execute(select(models.Task.id, models.Task.owner_id)
+                      .filter(models.Task.status == "complete", alive(), models.Task.updated_at < before, not_last())
+                      .order_by(models.Task.updated_at)
+                      .limit(limit)).all()
+    by_owner: dict[int, list[int]] = {}
+    for task_id, owner_id in rows:
+        by_owner.setdefault(owner_id, []).append(task_id)
+    now = datetime.utcnow()
+    for owner_id, ids in by_owner.items():
+        version = bump_version(db, owner_id)
+        db.execute(insert(models.ArchivedTask).from_select(
+            ["id", "name", "status", "created_at", "updated_at", "owner_id", "version", "archived_at"],
+            select(models.Task.id, models.Task.name, models.Task.status, models.Task.created_at,
+                   models.Task.updated_at, models.Task.owner_id, literal(version), literal(now))
+            .filter(models.Task.id.in_(ids))))
+        db.execute(delete(models.Task).filter(models.Task.id.in_(ids)).execution_options(synchronize_session=False))
+        publish_changes(db, owner_id, version, deleted=ids)
+    return len(rows)
+
+# -------- BUSCA --------
+tasks_fts = table("tasks_fts", column("rowid"))
+
+def fts_query(owner_id: int, q: str) -> str:
+    # Cada termo vira uma string FTS5 entre aspas com prefixo (*): sem operadores vindos do usuário
+    terms = ['"' + term.replace('"', '""') + '"*' for term in q.split()]
+    return f'owner_id:"{owner_id}" AND name:(' + " ".join(terms) + ")"
+
+def check_search(q: str | None, include_archived: bool):
+    # O índice FTS5 cobre só a tabela tasks: a busca não inclui as arquivadas
+    if q and include_archived:
+        raise HTTPException(status_code=400, detail="q cannot be combined with include_archived")
+
+def search_select(owner_id: int, q: str, status: str | None, dialect: str):
+    stmt = select(models.Task).filter(models.Task.owner_id == owner_id, alive())
+    if status:
+        stmt = stmt.filter(models.Task.status == status)
+    if dialect != "sqlite":
+        # Sem FTS5: busca simples por substring
+        for term in q.split():
+            stmt = stmt.filter(models.Task.name.ilike(f"%{term}%"))
+        return stmt.order_by(models.Task.created_at, models.Task.id)
+    return (stmt.join(tasks_fts, tasks_fts.c.rowid == models.Task.id)
+            .filter(text("tasks_fts MATCH :match").bindparams(match=fts_query(owner_id, q)))
+            .order_by(literal_column("bm25(tasks_fts)"), models.Task.id))
+
+def owned_task_select(task_id: int, owner_id: int):
+    return select(models.Task).filter(models.Task.id == task_id, models.Task.owner_id == owner_id, alive())
+
+def stats_select(owner_id: int):
+    return (select(models.Task.status, func.count())
+            .filter(models.Task.owner_id == owner_id, alive())
+            .group_by(models.Task.status))
+
+def stats_from_rows(rows) -> schemas.TaskStats:
+    counts = dict(rows)
+    return schemas.TaskStats(total=sum(counts.values()),
+                             incomplete=counts.get("incomplete", 0),
+                             complete=counts.get("complete", 0))
+
+def count_tasks(db: Session, owner_id: int) -> schemas.TaskStats:
+    return stats_from_rows(db.execute(stats_select(owner_id)).all())
+
+def apply_task_update(task: models.Task, task_update: schemas.TaskUpdate):
+    if task_update.name is not None:
+        task.name = task_update.name
+    if task_update.status is not None:
+        task.status = task_update.status
+
+def publish_changes(db: Session, owner_id: int, version: int, tasks=(), deleted=()):
+    # Evento no mesmo formato de /tasks/changes, publicado (broker do Database) após o commit
+    changes = schemas.TaskChanges(token=version, reset=False,
+                                  tasks=[schemas.Task.model_validate(t) for t in tasks],
+                                  deleted=list(deleted))
+    queue_event(db, owner_id, changes.model_dump_json())
+
+def publish_resync(db: Session, owner_id: int, version: int):
+    # Evento "resync": só o token, para mudanças grandes demais para um evento (importação)
+    queue_event(db, owner_id, orjson.dumps({"token": version}).decode(), event="resync")
+
+# Mutações: recebem a sessão e não fazem commit, para poderem rodar no writer (writer.run_write).
+# Cada task alterada recebe a nova versão do usuário, que é o token do delta-sync.
+def create_task(db: Session, owner_id: int, name: str) -> models.Task:
+    task = models.Task(name=name, owner_id=owner_id, version=bump_version(db, owner_id))
+    db.add(task)
+    db.flush()
+    publish_changes(db, owner_id, task.version, tasks=[task])
+    return task
+
+def update_task(db: Session, task_id: int, owner_id: int, task_update: schemas.TaskUpdate) -> models.Task | None:
+    task = db.scalars(owned_task_select(task_id, owner_id)).first()
+    if task is None and unarchive_tasks(db, owner_id, [task_id]):
+        task = db.scalars(owned_task_select(task_id, owner_id)).first()
+    if task is None:
+        return None
+    apply_task_update(task, task_update)
+    task.version = bump_version(db, owner_id)
+    db.flush()
+    publish_changes(db, owner_id, task.version, tasks=[task])
+    return task
+
+def delete_task(db: Session, task_id: int, owner_id: int) -> bool:
+    task = db.scalars(owned_task_select(task_id, owner_id)).first()
+    if task is None:
+        # Arquivada (ou inexistente): mesmo caminho da remoção em lote
+        return delete_tasks(db, owner_id, [task_id])[0].ok
+    task.deleted_at = datetime.utcnow()
+    task.version = bump_version(db, owner_id)
+    db.flush()
+    publish_changes(db, owner_id, task.version, deleted=[task.id])
+    return True
+
+# -------- BATCH --------
+def owned_ids(db: Session, owner_id: int, ids) -> set[int]:
+    return set(db.scalars(select(models.Task.id).filter(models.Task.owner_id == owner_id, alive(),
+                                                        models.Task.id.in_(set(ids)))))
+
+def create_tasks(db: Session, owner_id: int, names: list[str]) -> list[models.Task]:
+    if not names:
+        return []
+    version = bump_version(db, owner_id)
+    rows = [{"name": name, "owner_id": owner_id, "version": version} for name in names]
+    tasks = list(db.scalars(insert(models.Task).returning(models.Task, sort_by_parameter_order=True), rows))
+    publish_changes(db, owner_id, version, tasks=tasks)
+    return tasks
+
+def update_tasks(db: Session, owner_id: int, updates: list[schemas.TaskBatchUpdate]) -> list[schemas.TaskBatchResult]:
+    # Só as arquivadas com algum campo a alterar voltam para tasks: todas ganham a versão do lote
+    unarchive_tasks(db, owner_id, [u.id for u in updates if u.model_dump(exclude={"id"}, exclude_none=True)])
+    allowed = owned_ids(db, owner_id, [u.id for u in updates])
+    params = [{"id": u.id, **u.model_dump(exclude={"id"}, exclude_none=True)} for u in updates if u.id in allowed]
+    params = [p for p in params if len(p) > 1]
+    if params:
+        # UPDATE em lote por chave primária (executemany)
+        version, now = bump_version(db, owner_id), datetime.utcnow()
+        db.execute(update(models.Task), [{**p, "version": version, "updated_at": now} for p in params])
+    tasks = {t.id: t for t in db.scalars(select(models.Task).filter(models.Task.id.in_(allowed))
+                                         .execution_options(populate_existing=True))}
+    if params:
+        publish_changes(db, owner_id, version, tasks=[tasks[p["id"]] for p in params])
+    return [schemas.TaskBatchResult(id=u.id, ok=True, task=schemas.Task.model_validate(tasks[u.id]))
+            if u.id in tasks else schemas.TaskBatchResult(id=u.id, ok=False, detail="Task not found")
+            for u in updates]
+
+# Nas ações em conjunto a versão é reservada antes do UPDATE (as linhas são marcadas com ela)
+# e devolvida pelo savepoint se nenhuma task foi afetada. Nas remoções, `archived` seleciona
+# as arquivadas que também saem (ids somados aos devolvidos)
+def bulk_update(db: Session, owner_id: int, criteria, values: dict, returning, archived=None) -> tuple[int, list]:
+    with db.begin_nested() as savepoint:
+        version = bump_version(db, owner_id)
+        rows = db.scalars(
+            update(models.Task)
+            .filter(models.Task.owner_id == owner_id, alive(), *criteria)
+            .values(**values, updated_at=datetime.utcnow(), version=version)
+            .returning(returning)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        ).all()
+        if archived is not None:
+            rows += delete_archived(db, owner_id, archived, version)
+        if not rows:
+            savepoint.rollback()
+    return version, rows
+
+def delete_tasks(db: Session, owner_id: int, ids: list[int]) -> list[schemas.TaskBatchResult]:
+    deleted = set()
+    if ids:
+        version, rows = bulk_update(db, owner_id, [models.Task.id.in_(set(ids))],
+                                    {"deleted_at": datetime.utcnow()}, models.Task.id,
+                                    archived=[models.ArchivedTask.id.in_(set(ids))])
+        if rows:
+            deleted = set(rows)
+            publish_changes(db, owner_id, version, deleted=rows)
+    return [schemas.TaskBatchResult(id=i, ok=True) if i in deleted
+            else schemas.TaskBatchResult(id=i, ok=False, detail="Task not found")
+            for i in ids]
+
+def complete_all(db: Session, owner_id: int) -> schemas.TaskBulkResult:
+    version, tasks = bulk_update(db, owner_id, [models.Task.status != "complete"], {"status": "complete"}, models.Task)
+    if tasks:
+        publish_changes(db, owner_id, version, tasks=tasks)
+    return schemas.TaskBulkResult(count=len(tasks))
+
+def delete_completed(db: Session, owner_id: int) -> schemas.TaskBulkResult:
+    version, ids = bulk_update(db, owner_id, [models.Task.status == "complete"],
+                               {"deleted_at": datetime.utcnow()}, models.Task.id,
+                               archived=[models.ArchivedTask.status == "complete"])
+    if ids:
+        publish_changes(db, owner_id, version, deleted=ids)
+    return schemas.TaskBulkResult(count=len(ids))
+
+# -------- DELTA-SYNC --------
+def sync_state_select(owner_id: int):
+    return select(models.TaskVersion.version, models.TaskVersion.purged_version).filter(models.TaskVersion.owner_id == owner_id)
+
+def needs_reset(since: int, version: int, purged_version: int) -> bool:
+    # Sem token, token de antes da última compactação (tombstones perdidos) ou de outro banco
+    return since <= 0 or since < purged_version or since > version
+
+def changes_select(owner_id: int, since: int):
+    # Inclui os tombstones: é assim que o cliente fica sabendo das remoções
+    return (select(models.Task)
+            .filter(models.Task.owner_id == owner_id, models.Task.version > since)
+            .order_by(models.Task.version, models.Task.id))
+
+def changes_rows(stmt):
+    # Colunas de schemas.Task + deleted_at, que separa os tombstones
+    return task_rows(stmt).add_columns(models.Task.deleted_at)
+
+def archived_since_select(owner_id: int, since: int):
+    # Arquivadas depois do token: para a lista do cliente (só tasks vivas) equivalem a removidas
+    return select(models.ArchivedTask.id).filter(models.ArchivedTask.owner_id == owner_id,
+                                                 models.ArchivedTask.version > since)
+
+def build_changes(version: int, reset: bool, rows, archived=()) -> dict:
+    # Mesmo formato de schemas.TaskChanges, já pronto para o orjson
+    return {"token": version, "reset": reset,
+            "tasks": task_dicts(row[:-1] for row in rows if row.deleted_at is None),
+            "deleted": [row.id for row in rows if row.deleted_at is not None] + list(archived)}
+
+def task_changes(db: Session, owner_id: int, since: int) -> dict:
+    # A versão é lida antes das tasks: uma escrita concorrente no meio só faz a task vir de
+    # novo no próximo sync (aplicar é idempotente), nunca ser perdida
+    version, purged_version = db.execute(sync_state_select(owner_id)).first() or (0, 0)
+    reset = needs_reset(since, version, purged_version)
+    stmt = tasks_select(owner_id) if reset else changes_select(owner_id, since)
+    archived = () if reset else db.scalars(archived_since_select(owner_id, since)).all()
+    return build_changes(version, reset, db.execute(changes_rows(stmt)).all(), archived)
+
+def compact_tombstones(db: Session, before: datetime) -> int:
+    # Remove de vez os tombstones antigos e guarda, por usuário, a maior versão removida
+    purged = db.execute(select(models.Task.owner_id, func.max(models.Task.version))
+                        .filter(models.Task.deleted_at < before, not_last())
+                        .group_by(models.Task.owner_id)).all()
+    for owner_id, version in purged:
+        db.execute(update(models.TaskVersion)
+                   .filter(models.TaskVersion.owner_id == owner_id, models.TaskVersion.purged_version < version)
+                   .values(purged_version=version)
+                   .execution_options(synchronize_session=False))
+    result = db.execute(delete(models.Task).filter(models.Task.deleted_at < before, not_last())
+                        .execution_options(synchronize_session=False))
+    return result.rowcount
+
+# -------- STREAMING / EXPORTAÇÃO --------
+def ndjson_chunk(rows) -> bytes:
+    return b"".join(orjson.dumps(task) + b"\n" for task in task_dicts(rows))
+
+def csv_chunk(rows) -> bytes:
+    # Datas no mesmo formato do JSON (isoformat); None vira campo vazio
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        [value.isoformat() if isinstance(value, datetime) else value for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", b"", ndjson_chunk),
+    "csv": ("text/csv; charset=utf-8", (",".join(TASK_FIELDS) + "\r\n").encode(), csv_chunk),
+}
+
+def stream_tasks(session_factory, stmt, format: str = "ndjson"):
+    # stmt: consulta de linhas (listing_rows)
+    # Sessão própria: a do Depends(get_db) é fechada antes do corpo ser enviado.
+    # Cursor no servidor (yield_per): memória constante, STREAM_CHUNK_SIZE linhas por vez
+    _, header, encode = EXPORT_FORMATS[format]
+    db = session_factory()
+    try:
+        if header:
+            yield header
+        result = db.execute(stmt.execution_options(yield_per=STREAM_CHUNK_SIZE))
+        for chunk in result.partitions():
+            yield encode(chunk)
+    finally:
+        db.close()
+
+# -------- LISTAGEM --------
+class TaskListing:
+    """Uma requisição de GET /tasks/: monta a consulta (busca ou listagem, página ou stream) e a
+    resposta a partir das linhas. As rotas síncronas (main.py) e assíncronas (aio.py) só
+    executam `stmt` na sessão delas e passam o resultado para `page`."""
+
+    def __init__(self, owner_id: int, status: str | None = None, q: str | None = None,
+                 limit: int | None = None, cursor: str | None = None, include_archived: bool = False,
+                 stream: bool = False, dialect: str = "sqlite"):
+        check_search(q, include_archived)
+        self.limit = limit
+        self.search = bool(q and q.strip())
+        # A busca pagina por offset (ordem por relevância) e não tem stream
+        self.stream = stream and not self.search
+        if self.search:
+            self.offset = decode_offset_cursor(cursor) if cursor else 0
+            stmt = task_rows(search_select(owner_id, q, status, dialect)).offset(self.offset)
+        else:
+            # Tasks arquivadas (concluídas antigas, ver archive_tasks) só com include_archived
+            stmt = listing_rows(owner_id, status, cursor, include_archived)
+        if limit is not None:
+            # Busca um a mais para saber se existe próxima página
+            stmt = stmt.limit(limit if self.stream else limit + 1)
+        self.stmt = stmt
+
+    def streaming(self, session_factory, response: Response) -> StreamingResponse:
+        return StreamingResponse(stream_tasks(session_factory, self.stmt), media_type="application/x-ndjson",
+                                 headers=dict(response.headers))
+
+    def page(self, result, response: Response) -> Response:
+        if self.limit is None:
+            return json_response(task_dicts(result), response)
+        tasks = result.all()
+        if len(tasks) > self.limit:
+            tasks = tasks[:self.limit]
+            response.headers["X-Next-Cursor"] = (encode_offset_cursor(self.offset + self.limit) if self.search
+                                                 else encode_cursor(tasks[-1]))
+        return json_response(task_dicts(tasks), response)
+
+# -------- IMPORTAÇÃO --------
+class TaskImportError(ValueError):
+    def __init__(self, row: int, message: str):
+        super().__init__(f"row {row}: {message}" if row else message)
+        self.row = row
+
+def parse_datetime(value, row: int) -> datetime | None:
+    if value in (None, ""):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise TaskImportError(row, f"invalid datetime {value!r}")
+    # As colunas guardam UTC sem fuso (datetime.utcnow): converte antes de descartar o offset
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def import_row(record, row: int) -> dict:
+    # Mesmos campos da exportação; id e updated_at são ignorados (ids novos)
+    if not isinstance(record, dict):
+        raise TaskImportError(row, "expected an object")
+    name = record.get("name")
+    if not isinstance(name, str) or not name:
+        raise TaskImportError(row, "name is required")
+    status = record.get("status") or "incomplete"
+    if not isinstance(status, str):
+        raise TaskImportError(row, "status must be a string")
+    created_at = parse_datetime(record.get("created_at"), row) or datetime.utcnow()
+    return {"name": name, "status": status, "created_at": created_at, "updated_at": created_at}
+
+class NeedMoreData(Exception):
+    pass
+
+class CSVLines:
+    """Linhas do corpo para um único csv.reader, que trata as aspas e as quebras de linha dentro
+    delas. As linhas do registro em leitura ficam guardadas: se o corpo que chegou termina no
+    meio dele, voltam para a fila e o registro é lido de novo com o resto."""
+
+    def __init__(self):
+        self.lines: deque[str] = deque()
+        self.record: list[str] = []
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if self.lines:
+            self.record.append(self.lines.popleft())
+            return self.record[-1]
+        if not self.closed:
+            self.lines.extendleft(reversed(self.record))
+            self.record = []
+            raise NeedMoreData
+        if self.record:
+            # Corpo terminou dentro de um campo entre aspas
+            raise EOFError
+        raise StopIteration
+
+    def pending(self) -> int:
+        return sum(map(len, self.lines))
+
+class TaskImportParser:
+    """Lê o corpo (NDJSON ou CSV com cabeçalho) em pedaços, na ordem em que chegam, e devolve
+    as linhas completas já validadas. Só a linha (ou o registro CSV) incompleta do fim de cada
+    pedaço fica guardada, até `max_row` bytes."""
+
+    def __init__(self, format: str, max_row: int = TASKS_IMPORT_ROW_MAX_BYTES):
+        self.format = format
+        self.max_row = max_row
+        self.buffer = b""
+        self.rows = 0
+        self.header = None
+        self.lines = CSVLines()
+        self.reader = csv.reader(self.lines)
+
+    def feed(self, data: bytes) -> list[dict]:
+        lines = (self.buffer + data).split(b"\n")
+        self.buffer = lines.pop()
+        rows = self.parse([line + b"\n" for line in lines])
+        if len(self.buffer) + self.lines.pending() > self.max_row:
+            raise TaskImportError(self.rows + 1, f"row longer than {self.max_row} bytes")
+        return rows
+
+    def close(self) -> list[dict]:
+        lines, self.buffer = [self.buffer], b""
+        self.lines.closed = True
+        return self.parse(lines)
+
+    def parse(self, lines: list[bytes]) -> list[dict]:
+        if self.format == "csv":
+            return self.parse_csv(lines)
+        rows = []
+        for line in lines:
+            if not line.strip():
+                continue
+            self.rows += 1
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                raise TaskImportError(self.rows, "invalid JSON")
+            rows.append(import_row(record, self.rows))
+        return rows
+
+    def parse_csv(self, lines: list[bytes]) -> list[dict]:
+        for line in lines:
+            try:
+                # BOM (utf-8-sig) só no início do corpo
+                first = self.header is None and not self.lines.record and not self.lines.lines
+                self.lines.lines.append(line.decode("utf-8-sig" if first else "utf-8"))
+            except UnicodeDecodeError:
+                raise TaskImportError(self.rows + 1, "invalid UTF-8")
+        rows = []
+        while True:
+            try:
+                values = next(self.reader)
+            except (NeedMoreData, StopIteration):
+                return rows
+            except EOFError:
+                raise TaskImportError(self.rows + 1, "unterminated quoted field")
+            except csv.Error as exc:
+                raise TaskImportError(self.rows + 1, str(exc))
+            self.lines.record = []
+            if len(values) <= 1 and not "".join(values).strip():
+                continue
+            if self.header is None:
+                self.header = [name.strip() for name in values]
+                if "name" not in self.header:
+                    raise TaskImportError(0, "CSV header must include a name column")
+                continue
+            self.rows += 1
+            rows.append(import_row(dict(zip(self.header, values)), self.rows))
+
+def import_tasks(db: Session, owner_id: int, rows: list[dict]) -> int:
+    # Uma versão por lote. Com RETURNING o SQLAlchemy junta as linhas em INSERTs de várias
+    # linhas (insertmanyvalues); no executemany comum o SQLite roda uma instrução por linha e o
+    # gatilho do FTS5 grava o índice a cada uma (~5x mais lento). Core (a tabela) evita o
+    # processamento por linha do bulk insert do ORM. O evento não leva as tasks (resync): os
+    # clientes buscam o delta em vez de receber o lote todo
+    version = bump_version(db, owner_id)
+    db.execute(insert(models.Task.__table__).returning(models.Task.id),
+               [{**row, "owner_id": owner_id, "version": version} for row in rows]).all()
+    publish_resync(db, owner_id, version)
+    return len(rows)
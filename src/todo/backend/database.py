@@ -1,11 +1,200 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import time
 
-DATABASE_URL = "sqlite:///./todo.db"
+from fastapi import HTTPException, Request, status
+from sqlalchemy import create_engine, event, inspect, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+from .events import EventBroker
+from .hashing import create_hashing_pool
+from .metrics import instrument_engine
+from .settings import async_url, connect_args
+from .throttle import create_login_throttle
+from .writer import WriteQueue
 
 Base = declarative_base()
+
+# Tabelas que ficam no diretório no modo SHARDS; as demais (tasks, versões, arquivo) no shard
+DIRECTORY_TABLES = {"users"}
+
+
+class RoutingSession(Session):
+    """Sessão do modo SHARDS: users no diretório (o bind da sessão) e o resto no shard do
+    usuário autenticado, guardado em info["shard"] por Database.route."""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        shard = self.info.get("shard")
+        if mapper is not None:
+            # Como Session.get_bind: aceita a classe mapeada além do Mapper
+            mapper = inspect(mapper)
+        if shard is None or (mapper is not None and mapper.persist_selectable.name in DIRECTORY_TABLES):
+            return super().get_bind(mapper, clause=clause, **kw)
+        return shard.async_engine.sync_engine if self.info.get("async") else shard.engine
+
+
+class Database:
+    """Engines, sessões, writer (group commit), broker de eventos, cache de tokens, limite de
+    logins e pool do bcrypt de uma instância do app.
+
+    Criado no lifespan de create_app a partir das configurações; nada conecta antes da
+    primeira sessão. As sessões levam a instância em `info["database"]` (ver database_of).
+    Com SHARDS > 0 este banco é o diretório e as tasks ficam nos shards (ver Shard).
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.info = {"database": self}
+        self.engine = self.create_engine(settings.DATABASE_URL)
+        # Só com ASYNC_DB, para o driver assíncrono (aiosqlite/asyncpg) não ser obrigatório
+        self.async_engine = self.create_async_engine(settings.ASYNC_DATABASE_URL)
+
+        self.shards = [Shard(self, index, settings.SHARD_URL.format(shard=index))
+                       for index in range(settings.SHARDS)]
+        # Shard de cada usuário já visto neste processo, por SHARD_CACHE_TTL_SECONDS (ver shard_of)
+        self.owner_shards: dict[int, tuple[float, Shard | None, bool]] = {}
+        session_class = RoutingSession if self.shards else Session
+        self.SessionLocal = sessionmaker(class_=session_class, autocommit=False, autoflush=False,
+                                         bind=self.engine, info=self.info)
+        self.AsyncSessionLocal = async_sessionmaker(self.async_engine, sync_session_class=session_class,
+                                                    autoflush=False, expire_on_commit=False,
+                                                    info={**self.info, "async": True})
+
+        self.broker = EventBroker(settings.EVENTS_QUEUE_SIZE)
+        self.write_queue = self.create_write_queue(settings.DATABASE_URL, self.info)
+
+        # Import tardio: tokens importa models, que importa este módulo
+        from .tokens import TokenCache
+
+        # Por instância: apps com bancos diferentes no mesmo processo não compartilham tokens
+        # validados nem contadores de tentativas
+        self.token_cache = TokenCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL_SECONDS)
+        self.login_throttle = create_login_throttle(settings)
+        # Processos do bcrypt criados no primeiro hash e encerrados em close()
+        self.hashing_pool = create_hashing_pool(settings)
+
+    # -------- ENGINES --------
+    def create_engine(self, url: str):
+        settings = self.settings
+        engine = create_engine(url, connect_args=connect_args(url),
+                               pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW)
+        self.instrument(engine)
+        return engine
+
+    def create_async_engine(self, url: str):
+        settings = self.settings
+        if not settings.ASYNC_DB:
+            return None
+        engine = create_async_engine(url, pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW)
+        self.instrument(engine.sync_engine)
+        return engine
+
+    def create_write_queue(self, url: str, info: dict):
+        settings = self.settings
+        if not settings.GROUP_COMMIT:
+            return None
+        return WriteQueue(url, settings.WRITE_BATCH_MAX, self.set_sqlite_pragmas, info, settings.METRICS_ENABLED)
+
+    def instrument(self, engine):
+        if engine.dialect.name == "sqlite":
+            event.listen(engine, "connect", self.set_sqlite_pragmas)
+        # Contagem e tempo das consultas (db_query_duration_seconds e por requisição, ver metrics.py)
+        if self.settings.METRICS_ENABLED:
+            instrument_engine(engine)
+
+    def set_sqlite_pragmas(self, dbapi_connection, connection_record):
+        settings = self.settings
+        cursor = dbapi_connection.cursor()
+        if settings.SQLITE_WAL:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    # -------- SHARDS --------
+    @property
+    def stores(self) -> list:
+        # Bancos com tasks (migrações e jobs): o principal, que no modo SHARDS ainda guarda os
+        # usuários não movidos, e os shards
+        return [self, *self.shards]
+
+    def assign_shard(self, user):
+        # Usuário novo: shard pelo id (o mesmo critério do rebalanceamento)
+        if self.shards:
+            user.shard = user.id % len(self.shards)
+
+    def cached_shard(self, owner_id: int) -> "tuple[Shard | None, bool] | None":
+        entry = self.owner_shards.get(owner_id)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1:]
+
+    def shard_of(self, owner_id: int) -> "tuple[Shard | None, bool]":
+        # (shard, moving) de users (shard NULL = tasks ainda no banco principal), relido do
+        # diretório a cada SHARD_CACHE_TTL_SECONDS: o rebalanceamento marca o usuário como
+        # "moving" e espera esse tempo antes de copiar, então nenhum processo continua usando
+        # o banco de origem depois da cópia
+        cached = self.cached_shard(owner_id)
+        if cached is not None:
+            return cached
+        from .models import User
+
+        with self.engine.connect() as conn:
+            index, moving = conn.execute(select(User.shard, User.moving).filter(User.id == owner_id)).first() or (None, False)
+        entry = (time.monotonic() + self.settings.SHARD_CACHE_TTL_SECONDS,
+                 self.shards[index] if index is not None else None, bool(moving))
+        self.owner_shards[owner_id] = entry
+        return entry[1:]
+
+    def route(self, db: Session, owner_id: int):
+        # Depois da autenticação: as consultas de tasks da sessão vão para o shard do usuário
+        if self.shards:
+            shard, moving = self.shard_of(owner_id)
+            if moving:
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                    detail="Tasks are being moved, try again shortly",
+                                    headers={"Retry-After": str(max(1, self.settings.SHARD_CACHE_TTL_SECONDS))})
+            db.info["shard"] = shard
+
+    async def close(self):
+        for store in self.stores:
+            if store.write_queue is not None:
+                store.write_queue.close()
+            store.engine.dispose()
+            if store.async_engine is not None:
+                await store.async_engine.dispose()
+        self.hashing_pool.shutdown()
+
+
+class Shard:
+    """Banco de tasks de uma parte dos usuários (modo SHARDS): engine, pool, sessões e writer
+    próprios, então as escritas de shards diferentes não disputam o mesmo lock do SQLite."""
+
+    def __init__(self, database: Database, index: int, url: str):
+        self.index = index
+        self.url = url
+        self.info = {"database": database, "shard": self}
+        self.engine = database.create_engine(url)
+        self.async_engine = database.create_async_engine(async_url(url))
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine, info=self.info)
+        self.write_queue = database.create_write_queue(url, self.info)
+
+
+def database_of(db: Session) -> Database:
+    return db.info["database"]
+
+def store_of(db: Session) -> Database | Shard:
+    # Banco das tasks do usuário da sessão: o shard (modo SHARDS) ou o principal
+    return db.info.get("shard") or db.info["database"]
+
+# Dependência de sessão DB: uma única sessão por requisição, compartilhada entre auth e rotas
+def get_db(request: Request):
+    db = request.app.state.database.SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db(request: Request):
+    async with request.app.state.database.AsyncSessionLocal() as db:
+        yield db
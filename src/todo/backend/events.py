@@ -0,0 +1,102 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Pub/sub em memória dos eventos de tasks por usuário (um processo; com vários workers cada
+# um só vê as mutações que ele mesmo fez). As mutações enfileiram o evento na sessão e ele é
+# publicado depois do commit, de qualquer thread (rotas síncronas, writer) ou do event loop,
+# no broker da instância do app dona da sessão (database.Database).
+
+
+class Subscription:
+    def __init__(self, owner_id: int, queue_size: int):
+        self.owner_id = owner_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.dropped = False
+
+    async def get(self) -> str | None:
+        # None: inscrição derrubada por ficar para trás; o cliente reconecta e ressincroniza
+        return await self.queue.get()
+
+
+class EventBroker:
+    """Fan-out dos eventos para filas limitadas por inscrito; quem enche a fila é desconectado."""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: dict[int, set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, owner_id: int) -> Subscription:
+        subscription = Subscription(owner_id, self.queue_size)
+        with self._lock:
+            self._subscribers[owner_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.owner_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.owner_id]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+    def publish(self, owner_id: int, data: str):
+        with self._lock:
+            subscribers = list(self._subscribers.get(owner_id, ()))
+        # Uma chamada por event loop (não por inscrito): call_soon_threadsafe acorda o loop
+        by_loop = defaultdict(list)
+        for subscription in subscribers:
+            by_loop[subscription.loop].append(subscription)
+        for loop, group in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(self._deliver, group, data)
+            except RuntimeError:
+                # loop já encerrado
+                for subscription in group:
+                    self.unsubscribe(subscription)
+
+    def _deliver(self, subscriptions: list[Subscription], data: str):
+        for subscription in subscriptions:
+            if subscription.dropped:
+                continue
+            try:
+                subscription.queue.put_nowait(data)
+            except asyncio.QueueFull:
+                self._drop(subscription)
+
+    def _drop(self, subscription: Subscription):
+        self.unsubscribe(subscription)
+        subscription.dropped = True
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+
+
+# ---------- SESSÃO ----------
+# Eventos pendentes ficam em session.info até o commit; descartados se a transação não vingar.
+# Vão para o broker já como mensagem SSE (event + data), enviada como está por /tasks/events
+def queue_event(db: Session, owner_id: int, data: str, event: str = "tasks"):
+    db.info.setdefault("task_events", []).append((owner_id, f"event: {event}\ndata: {data}\n\n"))
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session):
+    pending = session.info.pop("task_events", ())
+    if pending:
+        broker = session.info["database"].broker
+        for owner_id, data in pending:
+            broker.publish(owner_id, data)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending(session: Session, previous_transaction):
+    # Rollback de SAVEPOINT não descarta: as mutações só enfileiram depois de concluídas
+    if not previous_transaction.nested:
+        session.info.pop("task_events", None)
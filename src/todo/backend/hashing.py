@@ -0,0 +1,89 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+
+from functools import cache
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from .settings import BCRYPT_ROUNDS
+
+# passlib só é importado no primeiro hash: não pesa no import do app (nem dos workers)
+@cache
+def pwd_context():
+    from passlib.context import CryptContext
+
+    # min = max = default: hashes com outro custo (maior ou menor) são refeitos no login
+    return CryptContext(schemes=["bcrypt"], deprecated="auto",
+                        bcrypt__default_rounds=BCRYPT_ROUNDS,
+                        bcrypt__min_rounds=BCRYPT_ROUNDS,
+                        bcrypt__max_rounds=BCRYPT_ROUNDS)
+
+# Funções de módulo para poderem ser enviadas aos processos do pool
+def hash_password(password: str) -> str:
+    return pwd_context().hash(password)
+
+def verify_and_update(plain: str, hashed: str) -> tuple[bool, str | None]:
+    return pwd_context().verify_and_update(plain, hashed)
+
+@cache
+def dummy_hash() -> str:
+    return pwd_context().hash("dummy password")
+
+def verify_dummy(plain: str) -> tuple[bool, None]:
+    # Username inexistente: o mesmo custo de um verify real, para a latência não revelar
+    # quais usuários existem (o hash é gerado uma vez por processo)
+    pwd_context().verify(plain, dummy_hash())
+    return False, None
+
+
+class HashingPool:
+    """Executa bcrypt fora do threadpool das requisições, com limite de fila (503 quando cheio).
+
+    Um por instância do app (database.Database), encerrado no fim do lifespan dela: fechar um
+    app não cancela os hashes de outro no mesmo processo."""
+
+    def __init__(self, workers: int, queue_depth: int, retry_after: int):
+        self.workers = workers
+        self.limit = max(1, workers) + queue_depth
+        self.retry_after = retry_after
+        self._executor: ProcessPoolExecutor | None = None
+        self._pending = 0
+        self._lock = Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: fork de um processo com threads (uvicorn/anyio) pode travar
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.limit:
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                    detail="Server busy, try again later",
+                                    headers={"Retry-After": str(self.retry_after)})
+            self._pending += 1
+        try:
+            if self.workers <= 0:
+                return await run_in_threadpool(fn, *args)
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def create_hashing_pool(settings) -> HashingPool:
+    return HashingPool(settings.HASH_WORKERS, settings.HASH_QUEUE_DEPTH, settings.HASH_RETRY_AFTER_SECONDS)
@@ -1,67 +1,273 @@
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from fastapi import FastAPI, APIRouter, Body, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List
-from . import models, schemas
-from .database import SessionLocal, engine
+from . import schemas, crud, migrations, settings as default_settings
+from .database import Database, get_db, store_of
 from .auth import router as auth_router, get_current_user
+from .metrics import CallbackGauge, MetricsMiddleware, registry
+from .writer import run_write
+from .settings import (TASKS_PAGE_MAX, TASKS_BATCH_MAX, TASKS_IMPORT_BATCH_SIZE, TASKS_IMPORT_BATCH_MAX,
+                       EVENTS_KEEPALIVE_SECONDS)
 
-app = FastAPI(title="ToDo API")
+logger = logging.getLogger(__name__)
 
-app.include_router(auth_router)
+# -------- COMPACTAÇÃO --------
+# Os jobs percorrem todos os bancos com tasks (database.stores: o principal e os shards)
+def compact_tombstones(database: Database) -> int:
+    before = datetime.utcnow() - timedelta(seconds=database.settings.TOMBSTONE_TTL_SECONDS)
+    purged = 0
+    for store in database.stores:
+        with store.SessionLocal() as db:
+            purged += run_write(db, crud.compact_tombstones, before)
+    return purged
 
-models.Base.metadata.create_all(bind=engine)
+async def compact_tombstones_periodically(database: Database):
+    while True:
+        await asyncio.sleep(database.settings.TOMBSTONE_COMPACT_INTERVAL_SECONDS)
+        try:
+            purged = await run_in_threadpool(compact_tombstones, database)
+            if purged:
+                logger.info("compactação: %d tombstones removidos", purged)
+        except Exception:
+            logger.exception("falha na compactação de tombstones")
 
-# Dependência de sessão DB
-def get_db():
-    db = SessionLocal()
+# -------- ARQUIVAMENTO --------
+def archive_tasks(database: Database) -> int:
+    # Lotes pequenos, cada um uma transação curta no writer: as escritas das requisições
+    # entram entre um lote e outro em vez de esperar o arquivamento inteiro
+    settings = database.settings
+    before = datetime.utcnow() - timedelta(seconds=settings.ARCHIVE_AFTER_SECONDS)
+    archived = 0
+    for store in database.stores:
+        with store.SessionLocal() as db:
+            while True:
+                count = run_write(db, crud.archive_tasks, before, settings.ARCHIVE_BATCH_SIZE)
+                archived += count
+                if count < settings.ARCHIVE_BATCH_SIZE:
+                    break
+    return archived
+
+async def archive_tasks_periodically(database: Database):
+    while True:
+        await asyncio.sleep(database.settings.ARCHIVE_INTERVAL_SECONDS)
+        try:
+            archived = await run_in_threadpool(archive_tasks, database)
+            if archived:
+                logger.info("arquivamento: %d tasks movidas para tasks_archive", archived)
+        except Exception:
+            logger.exception("falha no arquivamento de tasks")
+
+# -------- LIFESPAN --------
+# Banco (engines, pool, pragmas), checagem/migração do schema e jobs sobem aqui, por
+# instância, e não no import do módulo
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = app.state.settings
+    database = Database(settings)
+    for store in database.stores:
+        await run_in_threadpool(migrations.migrate, store.engine)
+    app.state.database = database
+    if settings.METRICS_ENABLED:
+        registry.register(CallbackGauge("task_event_subscribers", "Open /tasks/events subscriptions",
+                                        database.broker.subscriber_count))
+        registry.register(CallbackGauge("hashing_pool_pending", "bcrypt jobs running or waiting in the hashing pool",
+                                        lambda: database.hashing_pool.pending))
+    jobs = []
+    if settings.TOMBSTONE_COMPACT_INTERVAL_SECONDS > 0:
+        jobs.append(asyncio.create_task(compact_tombstones_periodically(database)))
+    if settings.ARCHIVE_INTERVAL_SECONDS > 0:
+        jobs.append(asyncio.create_task(archive_tasks_periodically(database)))
     try:
-        yield db
+        yield
     finally:
-        db.close()
+        for job in jobs:
+            job.cancel()
+        await database.close()
+
+router = APIRouter()
 
 # -------- TASKS --------
-@app.post("/tasks/", response_model=schemas.Task)
-def create_task(task: schemas.TaskCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    db_task = models.Task(name=task.name, owner_id=current_user.id)
-    db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
-    return db_task
-
-@app.get("/tasks/", response_model=List[schemas.Task])
-def read_tasks(status: str | None = None, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    query = db.query(models.Task).filter(models.Task.owner_id == current_user.id)
-    if status:
-        query = query.filter(models.Task.status == status)
-    return query.all()
-
-@app.put("/tasks/{task_id}", response_model=schemas.Task)
-def update_task(task_id: int, task_update: schemas.TaskUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    task = db.query(models.Task).filter(models.Task.id == task_id, models.Task.owner_id == current_user.id).first()
+@router.post("/tasks/", response_model=schemas.Task)
+def create_task(task: schemas.TaskCreate, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    return run_write(db, crud.create_task, current_user.id, task.name)
+
+@router.get("/tasks/", response_model=List[schemas.Task])
+def read_tasks(response: Response,
+               status: str | None = None,
+               q: str | None = Query(None, min_length=1, max_length=200),
+               limit: int | None = Query(None, ge=1, le=TASKS_PAGE_MAX),
+               cursor: str | None = None,
+               stream: bool = False,
+               with_stats: bool = False,
+               include_archived: bool = False,
+               if_none_match: str | None = Header(None),
+               db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    listing = crud.TaskListing(current_user.id, status, q, limit, cursor, include_archived, stream,
+                               db.get_bind().dialect.name)
+    # ETag pela versão do usuário: lista inalterada responde 304 sem consultar a tabela tasks
+    version = crud.get_version(db, current_user.id)
+    not_modified = crud.not_modified(response, current_user.id, version, if_none_match)
+    if not_modified is not None:
+        return not_modified
+    # Token de delta-sync da listagem: o cliente que pagina segue por /tasks/changes?since=
+    response.headers["X-Sync-Token"] = str(version)
+
+    if with_stats:
+        # Contagem das abas junto da listagem: evita uma requisição extra no frontend
+        response.headers["X-Task-Stats"] = crud.count_tasks(db, current_user.id).model_dump_json()
+
+    if listing.stream:
+        return listing.streaming(store_of(db).SessionLocal, response)
+    # Listagens em colunas + orjson (crud.json_response); o response_model fica só na documentação
+    return listing.page(db.execute(listing.stmt), response)
+
+@router.get("/tasks/changes", response_model=schemas.TaskChanges)
+def read_task_changes(response: Response, since: int = 0, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    # Delta-sync: tasks criadas/alteradas e ids removidos desde o token (versão) do cliente
+    return crud.json_response(crud.task_changes(db, current_user.id, since), response)
+
+@router.get("/tasks/events")
+async def task_events(request: Request, current_user: schemas.User = Depends(get_current_user)):
+    # SSE: cada mutação publica um evento "tasks" no formato de /tasks/changes (token = versão);
+    # a importação publica só "resync" com o token (o cliente busca o delta em /tasks/changes).
+    # Ao receber "ready" (já inscrito) o cliente ressincroniza com /tasks/changes e depois
+    # descarta os eventos com token já aplicado.
+    broker = request.app.state.database.broker
+
+    async def stream():
+        subscription = broker.subscribe(current_user.id)
+        try:
+            yield "retry: 3000\nevent: ready\ndata: {}\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.get(), EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            broker.unsubscribe(subscription)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/tasks/stats", response_model=schemas.TaskStats)
+def read_task_stats(response: Response, if_none_match: str | None = Header(None), db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    version = crud.get_version(db, current_user.id)
+    not_modified = crud.not_modified(response, current_user.id, version, if_none_match)
+    if not_modified is not None:
+        return not_modified
+    return crud.count_tasks(db, current_user.id)
+
+# -------- EXPORTAÇÃO / IMPORTAÇÃO --------
+@router.get("/tasks/export")
+def export_tasks(format: str = Query("ndjson", pattern="^(ndjson|csv)$"), include_archived: bool = True,
+                 db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    # Cópia completa por padrão: inclui as tasks arquivadas
+    media_type = crud.EXPORT_FORMATS[format][0]
+    stmt = crud.listing_rows(current_user.id, include_archived=include_archived)
+    return StreamingResponse(crud.stream_tasks(store_of(db).SessionLocal, stmt, format),
+                             media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="tasks.{format}"'})
+
+@router.post("/tasks/import", response_model=schemas.TaskBulkResult)
+async def import_tasks(request: Request,
+                       format: str | None = Query(None, pattern="^(ndjson|csv)$"),
+                       batch_size: int = Query(TASKS_IMPORT_BATCH_SIZE, ge=1, le=TASKS_IMPORT_BATCH_MAX),
+                       db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    # O corpo é lido em pedaços e cada lote de batch_size linhas é uma transação (INSERT de várias
+    # linhas). Linha inválida: 422 com o número da linha; os lotes anteriores já ficaram gravados.
+    if format is None:
+        format = "csv" if request.headers.get("content-type", "").startswith("text/csv") else "ndjson"
+    parser = crud.TaskImportParser(format)
+    rows, imported = [], 0
+    try:
+        async for data in request.stream():
+            rows.extend(parser.feed(data))
+            while len(rows) >= batch_size:
+                imported += await run_in_threadpool(run_write, db, crud.import_tasks, current_user.id, rows[:batch_size])
+                del rows[:batch_size]
+        rows.extend(parser.close())
+        if rows:
+            imported += await run_in_threadpool(run_write, db, crud.import_tasks, current_user.id, rows)
+    except crud.TaskImportError as exc:
+        raise HTTPException(status_code=422, detail={"error": str(exc), "row": exc.row, "imported": imported})
+    return schemas.TaskBulkResult(count=imported)
+
+# -------- BATCH --------
+@router.post("/tasks/batch", response_model=List[schemas.Task])
+def create_tasks(tasks: List[schemas.TaskCreate] = Body(..., max_length=TASKS_BATCH_MAX), db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    return run_write(db, crud.create_tasks, current_user.id, [t.name for t in tasks])
+
+@router.put("/tasks/batch", response_model=List[schemas.TaskBatchResult])
+def update_tasks(updates: List[schemas.TaskBatchUpdate] = Body(..., max_length=TASKS_BATCH_MAX), db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    return run_write(db, crud.update_tasks, current_user.id, updates)
+
+@router.post("/tasks/batch/delete", response_model=List[schemas.TaskBatchResult])
+def delete_tasks(body: schemas.TaskIds, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    if len(body.ids) > TASKS_BATCH_MAX:
+        raise HTTPException(status_code=422, detail=f"At most {TASKS_BATCH_MAX} ids per request")
+    return run_write(db, crud.delete_tasks, current_user.id, body.ids)
+
+@router.post("/tasks/complete-all", response_model=schemas.TaskBulkResult)
+def complete_all_tasks(db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    return run_write(db, crud.complete_all, current_user.id)
+
+@router.delete("/tasks/completed", response_model=schemas.TaskBulkResult)
+def delete_completed_tasks(db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    return run_write(db, crud.delete_completed, current_user.id)
+
+@router.put("/tasks/{task_id:int}", response_model=schemas.Task)
+def update_task(task_id: int, task_update: schemas.TaskUpdate, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    task = run_write(db, crud.update_task, task_id, current_user.id, task_update)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    
-    if task_update.name is not None:
-        task.name = task_update.name
-    if task_update.status is not None:
-        task.status = task_update.status
-    db.commit()
-    db.refresh(task)
     return task
 
-@app.delete("/tasks/{task_id}")
-def delete_task(task_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    task = db.query(models.Task).filter(models.Task.id == task_id, models.Task.owner_id == current_user.id).first()
-    if not task:
+@router.delete("/tasks/{task_id:int}")
+def delete_task(task_id: int, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    if not run_write(db, crud.delete_task, task_id, current_user.id):
         raise HTTPException(status_code=404, detail="Task not found")
-    db.delete(task)
-    db.commit()
     return {"detail": "Task deleted successfully"}
 
 # --- USER ROUTES ---
-@app.get("/users/me", response_model=schemas.User)
-def read_users_me(current_user: models.User = Depends(get_current_user)):
+@router.get("/users/me", response_model=schemas.User)
+def read_users_me(current_user: schemas.User = Depends(get_current_user)):
     return current_user
 
+# -------- APP --------
+async def metrics():
+    return Response(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def create_app(settings=default_settings) -> FastAPI:
+    """App com as próprias configurações (o módulo settings ou settings.override(...))."""
+    app = FastAPI(title="ToDo API", lifespan=lifespan)
+    app.state.settings = settings
+
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+        app.add_api_route("/metrics", metrics, include_in_schema=False)
+
+    # Com ASYNC_DB as rotas de aio.py são registradas primeiro e atendem os mesmos caminhos;
+    # ficam fora do schema para o OpenAPI ser idêntico nos dois modos.
+    if settings.ASYNC_DB:
+        from . import aio
+        app.include_router(aio.router, include_in_schema=False)
+
+    app.include_router(auth_router)
+    app.include_router(router)
+    return app
+
+app = create_app()
+
 
-# poetry run uvicorn src.todo.backend.main:app --reload
\ No newline at end of file
+# poetry run uvicorn src.todo.backend.main:app --reload
+# ou, com a factory: uvicorn --factory todo.backend.main:create_app
@@ -0,0 +1,253 @@
+import logging
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+
+from sqlalchemy import event
+
+from .settings import SLOW_REQUEST_MS, SLOW_REQUEST_SQL_MAX
+
+logger = logging.getLogger(__name__)
+
+# Métricas em memória no formato texto do Prometheus (um processo; com vários workers cada
+# um expõe as próprias). Só o essencial do cliente oficial: contadores, gauges e histogramas
+# de buckets fixos, com rótulos por tupla de valores.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple, object] = {}
+        self._lock = Lock()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class CallbackGauge(Metric):
+    """Gauge lido na hora da coleta (tamanho de filas, inscritos etc.)."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn):
+        super().__init__(name, help)
+        self.fn = fn
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", f"{self.name} {self.fn()}"]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float, *labels):
+        # Contagem por bucket (não cumulativa); acumula só na coleta
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            values = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Metric] = []
+
+    def register(self, metric: Metric):
+        # Mesmo nome substitui (gauges de instância registrados de novo a cada lifespan)
+        self.metrics = [m for m in self.metrics if m.name != metric.name] + [metric]
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+# ---------- MÉTRICAS ----------
+http_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Request latency by route template (until the response ends)",
+    ("method", "route", "status")))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Requests being served (SSE connections included)"))
+http_db_queries = registry.register(Histogram(
+    "http_request_db_queries", "SQL statements run per request", ("method", "route"), COUNT_BUCKETS))
+http_db_duration = registry.register(Histogram(
+    "http_request_db_seconds", "Time spent in SQL per request", ("method", "route")))
+db_duration = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL statement latency (requests, writer and background jobs)", ("operation",)))
+auth_duration = registry.register(Histogram(
+    "auth_duration_seconds", "bcrypt (hashing pool wait included) and JWT decode latency", ("operation",)))
+token_cache_lookups = registry.register(Counter(
+    "auth_token_cache_lookups_total", "Token cache lookups in get_current_user", ("result",)))
+login_throttled = registry.register(Counter(
+    "auth_login_throttled_total", "Logins rejected by the attempt limit before bcrypt", ("key",)))
+
+
+class timed:
+    """`with timed(histogram, *labels):` observa a duração do bloco."""
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, *labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+# ---------- SQL POR REQUISIÇÃO ----------
+class RequestStats:
+    __slots__ = ("queries", "seconds", "statements")
+
+    def __init__(self, keep_statements: bool):
+        self.queries = 0
+        self.seconds = 0.0
+        # Só com o log de requisições lentas ligado
+        self.statements: list[tuple[float, str]] | None = [] if keep_statements else None
+
+
+# O contexto é copiado para o threadpool (rotas síncronas), para o greenlet do AsyncSession
+# e para o writer (writer.submit), então o objeto da requisição acumula as consultas de todos
+request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_query_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    operation = statement.lstrip()[:6].lower()
+    db_duration.observe(elapsed, operation if operation in ("select", "insert", "update", "delete") else "other")
+    stats = request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += elapsed
+        if stats.statements is not None and len(stats.statements) < SLOW_REQUEST_SQL_MAX:
+            stats.statements.append((elapsed, statement))
+
+
+def instrument_engine(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ---------- MIDDLEWARE ----------
+class MetricsMiddleware:
+    """Middleware ASGI puro (sem BaseHTTPMiddleware): latência por rota, requisições em andamento,
+    consultas por requisição e o log opcional de requisições lentas (SLOW_REQUEST_MS)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats(SLOW_REQUEST_MS > 0)
+        token = request_stats.set(stats)
+        http_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_in_flight.dec()
+            request_stats.reset(token)
+            # Template da rota (/tasks/{task_id}), não o caminho: cardinalidade limitada
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            method = scope["method"]
+            http_duration.observe(elapsed, method, path, status)
+            http_db_queries.observe(stats.queries, method, path)
+            http_db_duration.observe(stats.seconds, method, path)
+            if SLOW_REQUEST_MS > 0 and elapsed * 1000 >= SLOW_REQUEST_MS:
+                log_slow_request(scope, status, elapsed, stats)
+
+
+def log_slow_request(scope, status: int, elapsed: float, stats: RequestStats):
+    # Sem os parâmetros das consultas: podem conter dados dos usuários
+    lines = [f"  {seconds * 1000:8.2f} ms  {' '.join(sql.split())}" for seconds, sql in stats.statements]
+    if stats.queries > len(stats.statements):
+        lines.append(f"  ... {stats.queries - len(stats.statements)} more")
+    logger.warning("slow request: %s %s -> %s in %.1f ms (%d queries, %.1f ms in SQL)%s",
+                   scope["method"], scope["path"], status, elapsed * 1000, stats.queries,
+                   stats.seconds * 1000, "".join("\n" + line for line in lines))
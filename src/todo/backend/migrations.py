@@ -0,0 +1,169 @@
+from sqlalchemy import (Column, DateTime, ForeignKey, Integer, MetaData, String, Table, inspect,
+                        text)
+from sqlalchemy.engine import Connection, Engine
+
+# Migrações de schema aplicadas em ordem; a versão atual fica na tabela schema_version.
+# Bancos novos rodam todas a partir do schema original (1). Bancos antigos, sem
+# schema_version mas com as tabelas, são tratados como versão 1.
+# O DDL de cada passo fica congelado aqui (SQL ou Table locais), nunca lido de models: mudar
+# o modelo depois não pode mudar o que uma migração já aplicada faz. Mudanças de schema
+# entram como um passo novo no fim de MIGRATIONS (e em models, que tem de bater com o resultado;
+# ver tests/test_migrations.py).
+
+def _datetime(conn: Connection) -> str:
+    # DATETIME no SQLite, TIMESTAMP WITHOUT TIME ZONE no Postgres
+    return DateTime().compile(dialect=conn.dialect)
+
+def _baseline(conn: Connection):
+    # Schema de antes das migrações; Table (e não SQL) pela chave autoincremental de cada banco
+    metadata = MetaData()
+    Table("users", metadata,
+          Column("id", Integer, primary_key=True, index=True),
+          Column("username", String, unique=True, index=True, nullable=False),
+          Column("hashed_password", String, nullable=False))
+    Table("tasks", metadata,
+          Column("id", Integer, primary_key=True, index=True),
+          Column("name", String, index=True, nullable=False),
+          Column("status", String),
+          Column("created_at", DateTime),
+          Column("owner_id", Integer, ForeignKey("users.id")))
+    metadata.create_all(bind=conn)
+
+def _task_indexes(conn: Connection):
+    for index in ("ix_tasks_id", "ix_tasks_name", "ix_users_id"):
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index}")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_tasks_owner_status_created "
+                         "ON tasks (owner_id, status, created_at, id)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_tasks_owner_created "
+                         "ON tasks (owner_id, created_at, id)")
+
+def _task_search(conn: Connection):
+    # FTS5 (external content) espelhando tasks.name; owner_id também é indexado para o MATCH
+    # já vir restrito ao dono em vez de filtrar depois os resultados de todos os usuários
+    if conn.dialect.name != "sqlite":
+        return
+    conn.exec_driver_sql("CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts "
+                         "USING fts5(name, owner_id, content='tasks', content_rowid='id')")
+    conn.exec_driver_sql("""
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts(rowid, name, owner_id) VALUES (new.id, new.name, new.owner_id);
+        END""")
+    conn.exec_driver_sql("""
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, name, owner_id) VALUES ('delete', old.id, old.name, old.owner_id);
+        END""")
+    conn.exec_driver_sql("""
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF name, owner_id ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, name, owner_id) VALUES ('delete', old.id, old.name, old.owner_id);
+            INSERT INTO tasks_fts(rowid, name, owner_id) VALUES (new.id, new.name, new.owner_id);
+        END""")
+    conn.exec_driver_sql("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+
+def _task_versions(conn: Connection):
+    conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS task_versions ("
+                         "owner_id INTEGER NOT NULL PRIMARY KEY REFERENCES users (id), "
+                         "version INTEGER NOT NULL)")
+
+def _task_tombstones(conn: Connection):
+    # updated_at, versão por task e soft-delete (tombstones) para o delta-sync
+    columns = {c["name"] for c in inspect(conn).get_columns("tasks")}
+    datetime = _datetime(conn)
+    if "updated_at" not in columns:
+        conn.exec_driver_sql(f"ALTER TABLE tasks ADD COLUMN updated_at {datetime}")
+        conn.exec_driver_sql("UPDATE tasks SET updated_at = created_at")
+    if "version" not in columns:
+        conn.exec_driver_sql("ALTER TABLE tasks ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    if "deleted_at" not in columns:
+        conn.exec_driver_sql(f"ALTER TABLE tasks ADD COLUMN deleted_at {datetime}")
+    if "purged_version" not in {c["name"] for c in inspect(conn).get_columns("task_versions")}:
+        conn.exec_driver_sql("ALTER TABLE task_versions ADD COLUMN purged_version INTEGER NOT NULL DEFAULT 0")
+    # Índices da listagem passam a ser parciais (só tasks vivas); deleted_at no fim mantém a
+    # contagem por status coberta
+    for index in ("ix_tasks_owner_status_created", "ix_tasks_owner_created"):
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index}")
+    conn.exec_driver_sql("CREATE INDEX ix_tasks_owner_status_created "
+                         "ON tasks (owner_id, status, created_at, id, deleted_at) WHERE deleted_at IS NULL")
+    conn.exec_driver_sql("CREATE INDEX ix_tasks_owner_created "
+                         "ON tasks (owner_id, created_at, id) WHERE deleted_at IS NULL")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_tasks_owner_version ON tasks (owner_id, version)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_tasks_deleted_at "
+                         "ON tasks (deleted_at) WHERE deleted_at IS NOT NULL")
+
+def _task_archive(conn: Connection):
+    datetime = _datetime(conn)
+    conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS tasks_archive ("
+                         "id INTEGER NOT NULL PRIMARY KEY, "
+                         "name VARCHAR NOT NULL, "
+                         "status VARCHAR NOT NULL, "
+                         f"created_at {datetime}, "
+                         f"updated_at {datetime}, "
+                         "version INTEGER NOT NULL, "
+                         f"archived_at {datetime} NOT NULL, "
+                         "owner_id INTEGER NOT NULL REFERENCES users (id))")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_tasks_archive_owner_created "
+                         "ON tasks_archive (owner_id, created_at, id)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_tasks_archive_owner_status_created "
+                         "ON tasks_archive (owner_id, status, created_at, id)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_tasks_archive_owner_version "
+                         "ON tasks_archive (owner_id, version)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_tasks_complete_updated "
+                         "ON tasks (updated_at) WHERE status = 'complete' AND deleted_at IS NULL")
+
+def _user_shards(conn: Connection):
+    if "shard" not in {c["name"] for c in inspect(conn).get_columns("users")}:
+        conn.exec_driver_sql("ALTER TABLE users ADD COLUMN shard INTEGER")
+
+def _user_moving(conn: Connection):
+    if "moving" not in {c["name"] for c in inspect(conn).get_columns("users")}:
+        conn.exec_driver_sql("ALTER TABLE users ADD COLUMN moving BOOLEAN NOT NULL DEFAULT FALSE")
+
+MIGRATIONS = [
+    (1, _baseline),
+    (2, _task_indexes),
+    (3, _task_search),
+    (4, _task_versions),
+    (5, _task_tombstones),
+    (6, _task_archive),
+    (7, _user_shards),
+    (8, _user_moving),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def current_version(conn: Connection) -> int | None:
+    return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar()
+
+def _stamp(conn: Connection, version: int):
+    conn.execute(text("INSERT INTO schema_version (version) VALUES (:version)"), {"version": version})
+
+def migrate(engine: Engine) -> int:
+    # Checagem só de leitura antes: workers subindo juntos com o schema em dia não
+    # disputam o lock de escrita do banco
+    with engine.connect() as conn:
+        if inspect(conn).has_table("schema_version") and current_version(conn) == LATEST_VERSION:
+            return LATEST_VERSION
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+        # Trava de escrita antes de ler a versão: workers subindo juntos num banco novo migram
+        # um de cada vez (o pysqlite não abre transação para DDL, só para DML)
+        if conn.dialect.name == "sqlite":
+            conn.exec_driver_sql("DELETE FROM schema_version WHERE 0")
+        else:
+            conn.exec_driver_sql("LOCK TABLE schema_version IN EXCLUSIVE MODE")
+        version = current_version(conn)
+        if version is None:
+            version = 1 if inspect(conn).has_table("tasks") else 0
+        for target, step in MIGRATIONS:
+            if target > version:
+                step(conn)
+                _stamp(conn, target)
+                version = target
+        return version
+
+
+if __name__ == "__main__":
+    # python -m todo.backend.migrations  (usa DATABASE_URL e, com SHARDS, SHARD_URL)
+    from . import settings
+    from .database import Database
+    for store in Database(settings).stores:
+        print(f"{store.engine.url}: schema version {migrate(store.engine)}")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, Index, false, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -6,19 +6,77 @@ from .database import Base
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     username = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
+    # Modo SHARDS: shard das tasks do usuário (NULL = banco principal)
+    shard = Column(Integer, nullable=True)
+    # Tasks sendo copiadas para outro shard: as requisições do usuário respondem 503 até o fim
+    moving = Column(Boolean, nullable=False, default=False, server_default=false())
 
     tasks = relationship("Task", back_populates="owner")
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Listagem por status e paginação por (created_at, id); o segundo cobre a aba "Todas".
+        # Parciais: só tasks vivas, as removidas (tombstones) não pesam nas listagens.
+        # deleted_at no fim mantém a contagem por status (stats_select) coberta pelo índice
+        Index("ix_tasks_owner_status_created", "owner_id", "status", "created_at", "id", "deleted_at",
+              sqlite_where=text("deleted_at IS NULL"), postgresql_where=text("deleted_at IS NULL")),
+        Index("ix_tasks_owner_created", "owner_id", "created_at", "id",
+              sqlite_where=text("deleted_at IS NULL"), postgresql_where=text("deleted_at IS NULL")),
+        # Delta-sync (/tasks/changes) e compactação dos tombstones
+        Index("ix_tasks_owner_version", "owner_id", "version"),
+        Index("ix_tasks_deleted_at", "deleted_at",
+              sqlite_where=text("deleted_at IS NOT NULL"), postgresql_where=text("deleted_at IS NOT NULL")),
+        # Candidatas ao arquivamento (concluídas há mais tempo)
+        Index("ix_tasks_complete_updated", "updated_at",
+              sqlite_where=text("status = 'complete' AND deleted_at IS NULL"),
+              postgresql_where=text("status = 'complete' AND deleted_at IS NULL")),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True, nullable=False)
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
     status = Column(String, default="incomplete")
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Versão do usuário (TaskVersion) na última mutação da task; deleted_at marca o tombstone
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+    deleted_at = Column(DateTime, nullable=True)
 
     owner_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="tasks")
+
+class ArchivedTask(Base):
+    # Tasks concluídas antigas, movidas para fora de "tasks" pelo arquivador (crud.archive_tasks).
+    # Mesmo id da task original; entram na listagem com ?include_archived=true. Editar devolve
+    # a task para "tasks" e remover deixa o tombstone lá (crud.unarchive_tasks/delete_archived)
+    __tablename__ = "tasks_archive"
+    __table_args__ = (
+        # Mesma ordem das listagens de tasks (com e sem filtro de status), para o UNION ALL
+        # de crud.listing_rows juntar as duas tabelas já ordenadas
+        Index("ix_tasks_archive_owner_created", "owner_id", "created_at", "id"),
+        Index("ix_tasks_archive_owner_status_created", "owner_id", "status", "created_at", "id"),
+        # Delta-sync: ids arquivados depois do token saem da lista do cliente como removidos
+        Index("ix_tasks_archive_owner_version", "owner_id", "version"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    # Versão do usuário no arquivamento
+    version = Column(Integer, nullable=False)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+class TaskVersion(Base):
+    # Versão das tasks de cada usuário, incrementada a cada mutação (base do ETag das listagens)
+    __tablename__ = "task_versions"
+
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    # Maior versão de tombstone já compactado: tokens de sync anteriores exigem recarga completa
+    purged_version = Column(Integer, nullable=False, default=0, server_default="0")
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
 
 # -------- Tasks --------
@@ -16,9 +16,36 @@ class Task(TaskBase):
     id: int
     status: str
     created_at: datetime
+    updated_at: datetime | None = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+class TaskBatchUpdate(TaskUpdate):
+    id: int
+
+class TaskIds(BaseModel):
+    ids: list[int]
+
+class TaskBatchResult(BaseModel):
+    id: int
+    ok: bool
+    detail: str | None = None
+    task: Task | None = None
+
+class TaskBulkResult(BaseModel):
+    count: int
+
+class TaskChanges(BaseModel):
+    # token: versão a enviar no próximo since; reset: tasks é a lista completa (descartar o estado local)
+    token: int
+    reset: bool
+    tasks: list[Task]
+    deleted: list[int]
+
+class TaskStats(BaseModel):
+    total: int
+    incomplete: int
+    complete: int
 
 # -------- Users --------
 class UserBase(BaseModel):
@@ -30,8 +57,7 @@ class UserCreate(UserBase):
 class User(UserBase):
     id: int
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # -------- Auth --------
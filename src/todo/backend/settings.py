@@ -1,5 +1,132 @@
+import os
+from collections.abc import Mapping
+from types import SimpleNamespace
+
 from decouple import config
+from sqlalchemy.engine import make_url
+
+DATABASE_URL: str = config("DATABASE_URL", default="sqlite:///./todo.db")
+
+# Pool de conexões. Overflow ilimitado (-1) por padrão: no SQLite conexões são baratas, e com
+# limite as rotas síncronas podem travar esperando conexão enquanto as sessões que as liberariam
+# aguardam uma thread livre para o teardown. Em servidores (Postgres) defina um limite.
+DB_POOL_SIZE: int = config("DB_POOL_SIZE", default=20, cast=int)
+DB_MAX_OVERFLOW: int = config("DB_MAX_OVERFLOW", default=-1, cast=int)
+
+# SQLite: WAL e pragmas aplicados em cada conexão nova
+SQLITE_WAL: bool = config("SQLITE_WAL", default=True, cast=bool)
+SQLITE_SYNCHRONOUS: str = config("SQLITE_SYNCHRONOUS", default="NORMAL")
+SQLITE_BUSY_TIMEOUT_MS: int = config("SQLITE_BUSY_TIMEOUT_MS", default=5000, cast=int)
+
+# Group commit: mutações de tasks passam por um único writer que agrupa requisições
+# concorrentes na mesma transação
+GROUP_COMMIT: bool = config("GROUP_COMMIT", default=DATABASE_URL.startswith("sqlite"), cast=bool)
+WRITE_BATCH_MAX: int = config("WRITE_BATCH_MAX", default=256, cast=int)
+
+# Variante assíncrona (AsyncEngine) das rotas de tasks e auth, para comparar com a síncrona
+ASYNC_DB: bool = config("ASYNC_DB", default=False, cast=bool)
+
+def async_url(url: str) -> str:
+    for sync_prefix, async_prefix in (("sqlite://", "sqlite+aiosqlite://"),
+                                      ("postgresql://", "postgresql+asyncpg://")):
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+def connect_args(url: str) -> dict:
+    # check_same_thread é opção do sqlite3 (conexões do pool usadas pelo threadpool); o
+    # psycopg2 e os outros drivers recusam o parâmetro
+    return {"check_same_thread": False} if make_url(url).get_backend_name() == "sqlite" else {}
+
+ASYNC_DATABASE_URL: str = config("ASYNC_DATABASE_URL", default=async_url(DATABASE_URL))
+
+# Shards: com SHARDS > 0 as tasks de cada usuário ficam em um de N bancos (SHARD_URL, com
+# {shard} = 0..N-1), cada um com engine, pool e writer próprios, e DATABASE_URL vira o
+# diretório (users e o shard de cada um). 0 = um banco só
+SHARDS: int = config("SHARDS", default=0, cast=int)
+SHARD_URL: str = config("SHARD_URL", default="sqlite:///./todo-shard-{shard}.db")
+# Por quanto tempo cada processo usa o shard de um usuário sem reler o diretório; o
+# rebalanceamento (python -m todo.backend.shards) espera esse tempo antes de copiar
+SHARD_CACHE_TTL_SECONDS: int = config("SHARD_CACHE_TTL_SECONDS", default=5, cast=int)
 
 SECRET_KEY: str = config("SECRET_KEY", default="changeme")
 ALGORITHM: str = config("ALGORITHM", default="HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES: int = config("ACCESS_TOKEN_EXPIRE_MINUTES", default=30, cast=int)
+
+# Cache de tokens verificados (get_current_user)
+TOKEN_CACHE_SIZE: int = config("TOKEN_CACHE_SIZE", default=10000, cast=int)
+TOKEN_CACHE_TTL_SECONDS: int = config("TOKEN_CACHE_TTL_SECONDS", default=60, cast=int)
+
+# Hash de senhas (bcrypt) em pool de processos dedicado
+BCRYPT_ROUNDS: int = config("BCRYPT_ROUNDS", default=12, cast=int)
+# 0 = roda no threadpool das requisições (comportamento antigo)
+HASH_WORKERS: int = config("HASH_WORKERS", default=max(1, (os.cpu_count() or 2) // 2), cast=int)
+HASH_QUEUE_DEPTH: int = config("HASH_QUEUE_DEPTH", default=64, cast=int)
+HASH_RETRY_AFTER_SECONDS: int = config("HASH_RETRY_AFTER_SECONDS", default=1, cast=int)
+
+# Limite de tentativas de login (janela deslizante, antes do bcrypt); 0 desliga o limite.
+# Logins bem-sucedidos não contam. BACKEND "memory" (por processo) ou "modulo:fabrica"
+LOGIN_THROTTLE_WINDOW_SECONDS: int = config("LOGIN_THROTTLE_WINDOW_SECONDS", default=300, cast=int)
+LOGIN_USER_MAX_ATTEMPTS: int = config("LOGIN_USER_MAX_ATTEMPTS", default=10, cast=int)
+LOGIN_IP_MAX_ATTEMPTS: int = config("LOGIN_IP_MAX_ATTEMPTS", default=100, cast=int)
+LOGIN_THROTTLE_MAX_KEYS: int = config("LOGIN_THROTTLE_MAX_KEYS", default=100_000, cast=int)
+LOGIN_THROTTLE_BACKEND: str = config("LOGIN_THROTTLE_BACKEND", default="memory")
+
+# Paginação / streaming de tasks
+TASKS_PAGE_MAX: int = config("TASKS_PAGE_MAX", default=1000, cast=int)
+STREAM_CHUNK_SIZE: int = config("STREAM_CHUNK_SIZE", default=500, cast=int)
+
+# Máximo de itens por requisição em /tasks/batch
+TASKS_BATCH_MAX: int = config("TASKS_BATCH_MAX", default=1000, cast=int)
+
+# /tasks/import: linhas por transação (padrão e máximo aceito em ?batch_size=)
+TASKS_IMPORT_BATCH_SIZE: int = config("TASKS_IMPORT_BATCH_SIZE", default=5000, cast=int)
+TASKS_IMPORT_BATCH_MAX: int = config("TASKS_IMPORT_BATCH_MAX", default=50000, cast=int)
+# Tamanho máximo de uma linha (NDJSON) ou registro (CSV) do corpo: limita o que fica guardado
+# esperando o fim da linha
+TASKS_IMPORT_ROW_MAX_BYTES: int = config("TASKS_IMPORT_ROW_MAX_BYTES", default=128 * 1024, cast=int)
+
+# Tombstones (tasks removidas) ficam disponíveis para o delta-sync por este tempo; a
+# compactação roda periodicamente (0 desativa)
+TOMBSTONE_TTL_SECONDS: int = config("TOMBSTONE_TTL_SECONDS", default=7 * 24 * 3600, cast=int)
+TOMBSTONE_COMPACT_INTERVAL_SECONDS: int = config("TOMBSTONE_COMPACT_INTERVAL_SECONDS", default=3600, cast=int)
+
+# Arquivamento: tasks concluídas (pelo updated_at) há mais de ARCHIVE_AFTER_SECONDS saem da
+# tabela tasks a cada ARCHIVE_INTERVAL_SECONDS (0 desliga), em transações de ARCHIVE_BATCH_SIZE
+ARCHIVE_AFTER_SECONDS: int = config("ARCHIVE_AFTER_SECONDS", default=30 * 24 * 3600, cast=int)
+ARCHIVE_INTERVAL_SECONDS: int = config("ARCHIVE_INTERVAL_SECONDS", default=3600, cast=int)
+ARCHIVE_BATCH_SIZE: int = config("ARCHIVE_BATCH_SIZE", default=500, cast=int)
+
+# Eventos de tasks (/tasks/events): fila por inscrito (quem enche é desconectado) e
+# intervalo do keepalive do SSE
+EVENTS_QUEUE_SIZE: int = config("EVENTS_QUEUE_SIZE", default=100, cast=int)
+EVENTS_KEEPALIVE_SECONDS: int = config("EVENTS_KEEPALIVE_SECONDS", default=15, cast=int)
+
+# Métricas (/metrics no formato do Prometheus) e log de requisições lentas com o SQL
+# executado (0 desativa; no máximo SLOW_REQUEST_SQL_MAX comandos por requisição)
+METRICS_ENABLED: bool = config("METRICS_ENABLED", default=True, cast=bool)
+SLOW_REQUEST_MS: int = config("SLOW_REQUEST_MS", default=0, cast=int)
+SLOW_REQUEST_SQL_MAX: int = config("SLOW_REQUEST_SQL_MAX", default=50, cast=int)
+
+# ---------------- INSTÂNCIAS ----------------
+# create_app(settings) recebe este módulo ou uma cópia com valores trocados, p.ex. um banco
+# por teste: create_app(settings.override(DATABASE_URL="sqlite:///tmp/a.db")). Valem por
+# instância o banco, o pool, ASYNC_DB, GROUP_COMMIT, métricas, eventos, compactação e o pool
+# do bcrypt (HASH_*); os limites das rotas, o JWT e BCRYPT_ROUNDS continuam lidos daqui. `base` troca os valores
+# de partida: outra cópia, o módulo ou um dict (override(base, SHARDS=0)).
+def override(base=None, /, **values) -> SimpleNamespace:
+    if base is None:
+        base = globals()
+    elif not isinstance(base, Mapping):
+        base = vars(base)
+    current = {name: value for name, value in base.items() if name.isupper()}
+    unknown = set(values) - set(current)
+    if unknown:
+        raise TypeError(f"unknown settings: {', '.join(sorted(unknown))}")
+    # Valores derivados de DATABASE_URL acompanham o novo banco, se não foram definidos
+    if "DATABASE_URL" in values:
+        if "ASYNC_DATABASE_URL" not in os.environ:
+            values.setdefault("ASYNC_DATABASE_URL", async_url(values["DATABASE_URL"]))
+        if "GROUP_COMMIT" not in os.environ:
+            values.setdefault("GROUP_COMMIT", values["DATABASE_URL"].startswith("sqlite"))
+    return SimpleNamespace(**{**current, **values})
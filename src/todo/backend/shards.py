@@ -0,0 +1,178 @@
+"""Rebalanceamento dos shards (modo SHARDS): move as tasks de usuários entre bancos.
+
+    python -m todo.backend.shards status
+    python -m todo.backend.shards move USER_ID SHARD     (SHARD = 0..N-1 ou "main")
+    python -m todo.backend.shards rebalance [--dry-run]   (todos para id % SHARDS)
+
+Pode rodar com a API no ar: cada processo relê o shard de um usuário a cada
+SHARD_CACHE_TTL_SECONDS (Database.shard_of). O usuário é marcado como "moving" e o move espera
+esse tempo (mais MOVE_GRACE_SECONDS) antes de copiar; até o fim da cópia as requisições dele
+respondem 503, então nada é gravado na origem depois de copiada.
+"""
+import argparse
+import time
+from datetime import datetime
+
+from sqlalchemy import delete, func, insert, select, update
+
+from . import models, settings
+from .crud import not_last
+from .database import Database
+from .migrations import migrate
+
+TASK_COLUMNS = ("name", "status", "created_at", "updated_at")
+
+# Folga além do SHARD_CACHE_TTL_SECONDS: requisições que já escolheram o banco antes da marca
+MOVE_GRACE_SECONDS = 1
+
+
+def open_database(config) -> Database:
+    # config: o módulo settings, um settings.override(...) ou um dict. Abre também os shards
+    # acima de SHARDS que ainda têm usuários (ao reduzir o número de shards)
+    config = settings.override(config, GROUP_COMMIT=False, ASYNC_DB=False)
+    directory = Database(settings.override(config, SHARDS=0))
+    # Diretório migrado antes de ler users (banco novo, ou sem a coluna moving)
+    migrate(directory.engine)
+    with directory.engine.connect() as conn:
+        highest = conn.scalar(select(func.max(models.User.shard)))
+    directory.engine.dispose()
+    count = max(config.SHARDS, (highest if highest is not None else -1) + 1)
+    database = Database(settings.override(config, SHARDS=count))
+    for store in database.stores:
+        migrate(store.engine)
+    return database
+
+
+def store_at(database: Database, index: int | None):
+    return database if index is None else database.shards[index]
+
+
+# -------- CÓPIA --------
+def purge_owner(db, owner_id: int):
+    # Remove as tasks do usuário de um banco (origem depois da cópia, ou sobras de um move
+    # interrompido no destino). A de maior id do banco vira tombstone (ver crud.not_last)
+    task = models.Task
+    db.execute(delete(task).filter(task.owner_id == owner_id, not_last())
+               .execution_options(synchronize_session=False))
+    db.execute(update(task).filter(task.owner_id == owner_id, task.deleted_at.is_(None))
+               .values(deleted_at=datetime.utcnow()).execution_options(synchronize_session=False))
+    db.execute(delete(models.ArchivedTask).filter(models.ArchivedTask.owner_id == owner_id))
+    db.execute(delete(models.TaskVersion).filter(models.TaskVersion.owner_id == owner_id))
+
+
+def copy_owner(source, target, owner_id: int) -> int:
+    # Tasks vivas e arquivadas ganham ids novos no destino; a versão nova com purged_version
+    # igual obriga os clientes a recarregar a lista (ids antigos não valem mais)
+    task, archived = models.Task, models.ArchivedTask
+    with source.SessionLocal() as db:
+        version = db.scalar(select(models.TaskVersion.version)
+                            .filter(models.TaskVersion.owner_id == owner_id)) or 0
+        archive = db.execute(select(*(getattr(archived, c) for c in TASK_COLUMNS), archived.archived_at)
+                             .filter(archived.owner_id == owner_id).order_by(archived.id)).all()
+        live = db.execute(select(*(getattr(task, c) for c in TASK_COLUMNS))
+                          .filter(task.owner_id == owner_id, task.deleted_at.is_(None))
+                          .order_by(task.id)).all()
+
+    version += 1
+    with target.SessionLocal() as db:
+        purge_owner(db, owner_id)
+        # Arquivadas primeiro: assim, com tasks vivas, a de maior id nunca é uma arquivada
+        rows = [{**row._asdict(), "owner_id": owner_id, "version": version} for row in (*archive, *live)]
+        ids = []
+        if rows:
+            ids = db.scalars(insert(task.__table__).returning(task.id, sort_by_parameter_order=True),
+                             [{c: row[c] for c in (*TASK_COLUMNS, "owner_id", "version")} for row in rows]).all()
+        archived_ids = ids[:len(archive)]
+        if archived_ids:
+            db.execute(insert(archived), [{**row, "id": id} for id, row in zip(archived_ids, rows)])
+            db.execute(delete(task).filter(task.id.in_(archived_ids), not_last())
+                       .execution_options(synchronize_session=False))
+            db.execute(update(task).filter(task.id.in_(archived_ids))
+                       .values(deleted_at=datetime.utcnow()).execution_options(synchronize_session=False))
+        db.add(models.TaskVersion(owner_id=owner_id, version=version, purged_version=version))
+        db.commit()
+    return len(rows)
+
+
+def move_user(database: Database, user_id: int, index: int | None) -> int:
+    # Marca o usuário, espera os processos da API relerem o diretório, copia para o destino,
+    # troca users.shard (e desmarca) e só então limpa a origem. Parar no meio deixa no máximo
+    # cópias sem uso, removidas pelo próximo move, que também desmarca o usuário
+    with database.SessionLocal() as db:
+        user = db.get(models.User, user_id)
+        if user is None:
+            raise SystemExit(f"user {user_id} not found")
+        if user.shard == index:
+            # Já no destino; desmarca se um move anterior parou antes da cópia
+            user.moving = False
+            db.commit()
+            return 0
+        user.moving = True
+        db.commit()
+        time.sleep(database.settings.SHARD_CACHE_TTL_SECONDS + MOVE_GRACE_SECONDS)
+        source, target = store_at(database, user.shard), store_at(database, index)
+        count = copy_owner(source, target, user_id)
+        user.shard = index
+        user.moving = False
+        db.commit()
+    with source.SessionLocal() as db:
+        purge_owner(db, user_id)
+        db.commit()
+    return count
+
+
+# -------- COMANDOS --------
+def status(database: Database):
+    with database.SessionLocal() as db:
+        users = dict(db.execute(select(models.User.shard, func.count()).group_by(models.User.shard)).all())
+    for index, store in enumerate(database.stores):
+        index = index - 1 if index else None
+        with store.SessionLocal() as db:
+            tasks = db.scalar(select(func.count()).select_from(models.Task)
+                              .filter(models.Task.deleted_at.is_(None)))
+            archived = db.scalar(select(func.count()).select_from(models.ArchivedTask))
+        name = "main" if index is None else f"shard {index}"
+        print(f"{name:<10}{store.engine.url}  users={users.get(index, 0)} tasks={tasks} archived={archived}")
+
+
+def rebalance(database: Database, shards: int, dry_run: bool = False):
+    # Todos os usuários no shard id % SHARDS (o critério de Database.assign_shard), inclusive
+    # os ainda no banco principal
+    with database.SessionLocal() as db:
+        users = db.execute(select(models.User.id, models.User.shard).order_by(models.User.id)).all()
+    for user_id, index in users:
+        if index == user_id % shards:
+            continue
+        if dry_run:
+            print(f"user {user_id}: {index} -> {user_id % shards}")
+            continue
+        count = move_user(database, user_id, user_id % shards)
+        print(f"user {user_id}: {index} -> {user_id % shards} ({count} tasks)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status")
+    move = commands.add_parser("move")
+    move.add_argument("user_id", type=int)
+    move.add_argument("shard")
+    commands.add_parser("rebalance").add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    database = open_database(settings)
+    if args.command == "status":
+        status(database)
+    elif args.command == "move":
+        index = None if args.shard == "main" else int(args.shard)
+        if index is not None and not 0 <= index < len(database.shards):
+            parser.error(f"shard must be main or 0..{len(database.shards) - 1}")
+        print(f"user {args.user_id}: {move_user(database, args.user_id, index)} tasks")
+    else:
+        if not settings.SHARDS:
+            parser.error("rebalance needs SHARDS > 0")
+        rebalance(database, settings.SHARDS, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
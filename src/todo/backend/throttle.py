@@ -0,0 +1,131 @@
+import abc
+import hashlib
+import importlib
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from threading import Lock
+
+from fastapi import HTTPException, status
+
+from .metrics import login_throttled
+
+# Limite de tentativas de login por IP e por username, checado antes da consulta e do bcrypt:
+# uma rajada de credential stuffing vira 429 barato em vez de ocupar todos os núcleos.
+# Tentativas que dão certo são devolvidas (release), então só as falhas (e as em andamento)
+# contam na janela. Um limitador por instância do app (database.Database).
+
+
+class ThrottleBackend(abc.ABC):
+    """Contadores de tentativas em janela deslizante por chave. O padrão (MemoryThrottle) é
+    por instância do app, em memória; com vários workers, um backend compartilhado (LOGIN_THROTTLE_BACKEND =
+    "modulo:fabrica") aplica o mesmo limite em todos."""
+
+    @abc.abstractmethod
+    async def acquire(self, key: str, limit: int, window: float) -> float:
+        """Registra uma tentativa e devolve 0; com `limit` tentativas na janela, não registra e
+        devolve os segundos até a mais antiga sair dela."""
+
+    @abc.abstractmethod
+    async def release(self, key: str):
+        """Esquece a tentativa mais recente da chave (login bem-sucedido)."""
+
+
+class MemoryThrottle(ThrottleBackend):
+    """Janela deslizante exata (horários das tentativas, no máximo `limit` por chave) em um LRU
+    de `max_keys` chaves: memória limitada mesmo com usernames aleatórios."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._attempts: OrderedDict[str, deque[float]] = OrderedDict()
+        self._lock = Lock()
+
+    async def acquire(self, key: str, limit: int, window: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            attempts = self._attempts.get(key)
+            if attempts is None:
+                attempts = self._attempts[key] = deque()
+                while len(self._attempts) > self.max_keys:
+                    self._attempts.popitem(last=False)
+            else:
+                self._attempts.move_to_end(key)
+            while attempts and attempts[0] <= now - window:
+                attempts.popleft()
+            if len(attempts) >= limit:
+                return attempts[0] + window - now
+            attempts.append(now)
+            return 0.0
+
+    async def release(self, key: str):
+        with self._lock:
+            attempts = self._attempts.get(key)
+            if attempts:
+                attempts.pop()
+
+
+def create_backend(spec: str, max_keys: int) -> ThrottleBackend:
+    if spec == "memory":
+        return MemoryThrottle(max_keys)
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)()
+
+
+class LoginThrottle:
+    def __init__(self, backend: ThrottleBackend, ip_limit: int, user_limit: int, window: float):
+        self.backend = backend
+        self.ip_limit = ip_limit
+        self.user_limit = user_limit
+        self.window = window
+
+    def limits(self, username: str, ip: str | None) -> list[tuple[str, str, int]]:
+        # IP primeiro: um IP bloqueado não cria chaves de username (nem desloca as outras do LRU)
+        limits = []
+        if ip and self.ip_limit > 0:
+            limits.append(("ip", f"ip:{ip}", self.ip_limit))
+        if self.user_limit > 0:
+            # Hash do username: o tamanho da chave não depende do que o cliente mandou
+            digest = hashlib.sha256(username.encode()).hexdigest()
+            limits.append(("user", f"user:{digest}", self.user_limit))
+        return limits
+
+    async def acquire(self, username: str, ip: str | None):
+        acquired = []
+        for kind, key, limit in self.limits(username, ip):
+            wait = await self.backend.acquire(key, limit, self.window)
+            if wait:
+                for done in acquired:
+                    await self.backend.release(done)
+                login_throttled.inc(kind)
+                raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                                    detail="Too many login attempts, try again later",
+                                    headers={"Retry-After": str(math.ceil(wait))})
+            acquired.append(key)
+
+    async def release(self, username: str, ip: str | None):
+        for _, key, _ in self.limits(username, ip):
+            await self.backend.release(key)
+
+    @asynccontextmanager
+    async def attempt(self, username: str, ip: str | None):
+        # Só o 401 conta como falha: login ok e erros do servidor (503 do hashing_pool, banco)
+        # devolvem a tentativa. Cancelamento (cliente desconectou) não devolve: o bcrypt já rodou
+        await self.acquire(username, ip)
+        try:
+            yield
+        except HTTPException as exc:
+            if exc.status_code != status.HTTP_401_UNAUTHORIZED:
+                await self.release(username, ip)
+            raise
+        except Exception:
+            await self.release(username, ip)
+            raise
+        else:
+            await self.release(username, ip)
+
+
+def create_login_throttle(settings) -> LoginThrottle:
+    return LoginThrottle(create_backend(settings.LOGIN_THROTTLE_BACKEND, settings.LOGIN_THROTTLE_MAX_KEYS),
+                         settings.LOGIN_IP_MAX_ATTEMPTS, settings.LOGIN_USER_MAX_ATTEMPTS,
+                         settings.LOGIN_THROTTLE_WINDOW_SECONDS)
@@ -0,0 +1,60 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+
+from . import models, schemas
+
+# Cache de tokens validados (claims + snapshot do usuário), um por instância do app
+# (database.Database): evita o decode do JWT e a consulta do usuário a cada requisição.
+
+
+class TokenCache:
+    """LRU limitado de token -> (claims, snapshot do usuário), expirando no máximo no `exp` do token."""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, dict, schemas.User]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, token: str):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return entry[2]
+
+    def set(self, token: str, claims: dict, user: schemas.User):
+        if self.maxsize <= 0:
+            return
+        expires_at = min(time.time() + self.ttl, claims.get("exp", 0))
+        with self._lock:
+            self._entries[token] = (expires_at, claims, user)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for token in [t for t, e in self._entries.items() if e[2].id == user_id]:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    # Invalida no cache da instância dona da sessão
+    database = object_session(target).info.get("database")
+    if database is not None:
+        database.token_cache.invalidate_user(target.id)
@@ -0,0 +1,141 @@
+import contextvars
+import queue
+import threading
+from concurrent.futures import Future
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+
+from .metrics import instrument_engine
+from .settings import connect_args
+
+
+def create_writer_engine(url: str, on_connect, metrics: bool):
+    # Conexão única e transações controladas por nós: o pysqlite não emite SAVEPOINT corretamente
+    # no modo padrão, e BEGIN IMMEDIATE pega o lock de escrita logo no início do lote.
+    writer_engine = create_engine(url, connect_args=connect_args(url),
+                                  pool_size=1, max_overflow=0)
+
+    @event.listens_for(writer_engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        on_connect(dbapi_connection, connection_record)
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(writer_engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    if metrics:
+        instrument_engine(writer_engine)
+    return writer_engine
+
+
+class WriteQueue:
+    """Writer único para o SQLite: agrupa as mutações pendentes em uma transação (group commit).
+
+    Cada operação é `fn(db, *args)` e roda em um SAVEPOINT próprio, então o erro de uma
+    não desfaz as outras do lote; cada chamador recebe o próprio resultado ou exceção.
+    `on_connect` aplica os pragmas nas conexões e `info` vai para as sessões do writer.
+    """
+
+    def __init__(self, url: str, max_batch: int, on_connect, info: dict | None = None, metrics: bool = False):
+        self.url = url
+        self.max_batch = max_batch
+        self.on_connect = on_connect
+        self.info = info or {}
+        self.metrics = metrics
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._engine = None
+        self._sessionmaker: sessionmaker | None = None
+
+    def submit(self, fn, *args) -> Future:
+        future = Future()
+        self._ensure_started()
+        # Cada operação roda no contexto de quem a enviou: as consultas contam para a requisição
+        self._queue.put((future, fn, args, contextvars.copy_context()))
+        return future
+
+    def run(self, fn, *args):
+        return self.submit(fn, *args).result()
+
+    def close(self):
+        with self._lock:
+            if self._thread is None:
+                return
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            self._engine.dispose()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._engine = create_writer_engine(self.url, self.on_connect, self.metrics)
+                self._sessionmaker = sessionmaker(bind=self._engine, autoflush=False, expire_on_commit=False,
+                                                  info=self.info)
+                self._thread = threading.Thread(target=self._loop, name="todo-writer", daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        results = []
+        try:
+            with self._sessionmaker() as db:
+                for future, fn, args, context in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with db.begin_nested():
+                            results.append((future, context.run(fn, db, *args), None))
+                    except Exception as exc:
+                        results.append((future, None, exc))
+                try:
+                    db.commit()
+                except Exception:
+                    # COMMIT recusado (ex.: FK adiada) deixa a transação aberta no SQLite: sem o
+                    # ROLLBACK, o BEGIN IMMEDIATE do próximo lote falharia na mesma conexão
+                    db.rollback()
+                    raise
+        except Exception as exc:
+            # Falha no commit: nenhuma operação do lote foi gravada
+            errors = {id(future): error for future, _, error in results if error is not None}
+            for future, *_ in batch:
+                if not future.done():
+                    future.set_exception(errors.get(id(future)) or exc)
+            return
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+def run_write(db: Session, fn, *args):
+    # Com GROUP_COMMIT cada banco tem um writer: o da instância (database.Database) da sessão
+    # ou, no modo SHARDS, o do shard do usuário (database.store_of)
+    write_queue = (db.info.get("shard") or db.info["database"]).write_queue
+    if write_queue is not None:
+        return write_queue.run(fn, *args)
+    result = fn(db, *args)
+    db.commit()
+    return result
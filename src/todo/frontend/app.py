@@ -1,22 +1,195 @@
+import asyncio
+import json
 import flet as ft
 import httpx
 
+try:
+    import h2  # noqa: F401  (httpx[http2])
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
 API_URL = "http://127.0.0.1:8000"
 
+# Lista virtualizada: páginas de PAGE_SIZE tasks buscadas sob demanda enquanto o usuário rola;
+# no máximo MAX_PAGES ficam carregadas (as que saem da tela são descartadas e buscadas de
+# novo se ele voltar), então memória e controles na tela não crescem com a conta
+PAGE_SIZE = 50
+MAX_PAGES = 4
+ROW_HEIGHT = 64
+PREFETCH_PX = PAGE_SIZE // 4 * ROW_HEIGHT
+
+# ---------------- API CLIENT ----------------
+class ApiClient:
+    """Um httpx.AsyncClient para a sessão inteira: conexões reaproveitadas (keep-alive),
+    HTTP/2 quando o h2 está instalado e o servidor negocia, timeouts e retentativas."""
+
+    IDEMPOTENT = {"GET", "HEAD", "PUT", "DELETE"}
+    RETRY_STATUS = {502, 503, 504}
+
+    def __init__(self, base_url, retries=2, backoff=0.3):
+        self.retries = retries
+        self.backoff = backoff
+        # retries do transporte: só falhas de conexão (requisição nem chegou a ser enviada)
+        transport = httpx.AsyncHTTPTransport(http2=HTTP2, retries=retries,
+                                             limits=httpx.Limits(max_connections=20, keepalive_expiry=30))
+        self.client = httpx.AsyncClient(base_url=base_url, transport=transport,
+                                        timeout=httpx.Timeout(10.0, connect=5.0))
+
+    def set_token(self, token):
+        if token:
+            self.client.headers["Authorization"] = f"Bearer {token}"
+        else:
+            self.client.headers.pop("Authorization", None)
+
+    def retry_delay(self, response, attempt):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(int(retry_after), 5)
+        return self.backoff * 2 ** attempt
+
+    async def request(self, method, url, **kwargs):
+        # Retenta leituras/escritas idempotentes em erro de rede ou 502/504, e qualquer
+        # método em 503 (a API responde 503 + Retry-After antes de processar, ex.: fila do bcrypt)
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.ConnectError:
+                raise  # já retentado pelo transporte
+            except httpx.TransportError:
+                if last or method not in self.IDEMPOTENT:
+                    raise
+                await asyncio.sleep(self.retry_delay(None, attempt))
+                continue
+            retryable = response.status_code == 503 or (
+                response.status_code in self.RETRY_STATUS and method in self.IDEMPOTENT)
+            if last or not retryable:
+                return response
+            await asyncio.sleep(self.retry_delay(response, attempt))
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url, **kwargs):
+        return await self.request("PUT", url, **kwargs)
+
+    async def delete(self, url, **kwargs):
+        return await self.request("DELETE", url, **kwargs)
+
+    def stream(self, method, url, **kwargs):
+        # Conexões longas (SSE): sem limite de leitura curto
+        return self.client.stream(method, url, timeout=httpx.Timeout(10.0, read=60.0), **kwargs)
+
+    async def login(self, username, password):
+        return await self.post("/auth/login", data={"username": username, "password": password})
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+# ---------------- LINHA DA LISTA ----------------
+class TaskRow:
+    """Controles de uma task, reaproveitados entre renderizações (chave: id da task)."""
+
+    def __init__(self, app, task):
+        self.app = app
+        self.task = task
+
+        # campo de texto da tarefa
+        self.field = ft.TextField(
+            value=task["name"],
+            expand=True,
+            border=ft.InputBorder.NONE,
+            read_only=True
+        )
+
+        # checkbox de status
+        self.cb = ft.Checkbox(
+            value=task["status"] == "complete",
+            on_change=self.status_changed
+        )
+
+        # botão editar
+        self.edit_btn = ft.IconButton(
+            icon=ft.Icons.EDIT,
+            icon_color=ft.Colors.BLUE,
+            tooltip="Editar",
+            on_click=self.toggle_edit
+        )
+
+        del_btn = ft.IconButton(
+            icon=ft.Icons.DELETE,
+            icon_color=ft.Colors.RED,
+            tooltip="Excluir",
+            on_click=self.delete_clicked
+        )
+
+        self.card = ft.Card(
+            content=ft.Row(
+                [self.cb, self.field, self.edit_btn, del_btn],
+                alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
+            ),
+            elevation=2,
+            margin=5,
+        )
+
+    def set_task(self, task):
+        self.task = task
+        if self.field.read_only:
+            # não sobrescreve o que o usuário está digitando
+            self.field.value = task["name"]
+        self.cb.value = task["status"] == "complete"
+
+    async def status_changed(self, e):
+        await self.app.toggle_status(e, self.task)
+
+    async def toggle_edit(self, e):
+        if self.field.read_only:
+            self.field.read_only = False
+            self.field.border = ft.InputBorder.OUTLINE
+            self.edit_btn.icon = ft.Icons.SAVE
+            self.card.update()
+        else:
+            self.field.read_only = True
+            self.field.border = ft.InputBorder.NONE
+            self.edit_btn.icon = ft.Icons.EDIT
+            self.card.update()
+            await self.app.edit_task(self.task["id"], self.field.value)
+
+    async def delete_clicked(self, e):
+        await self.app.delete_task(self.task["id"])
+
+
 class ToDoApp:
     def __init__(self, page: ft.Page):
         self.page = page
         self.page.title = "ToDo App"
         self.page.theme_mode = ft.ThemeMode.DARK
         self.page.theme = ft.Theme(color_scheme_seed=ft.Colors.INDIGO)
-        self.page.scroll = ft.ScrollMode.ALWAYS
         self.token = None
+        self.api = ApiClient(API_URL)
+        # Tasks carregadas (as páginas da janela, em ordem) e id -> TaskRow das linhas na tela
         self.tasks = []
+        self.rows = {}
+        self.reset_list()
+        self.stats = {"total": 0, "incomplete": 0, "complete": 0}
+        self.stats_etag = None
+        # Versão das tasks carregadas: eventos e /tasks/changes são aplicados a partir dela
+        self.sync_token = 0
+        # Um carregamento/sync da janela por vez
+        self.sync_lock = asyncio.Lock()
+        self.events_task = None
+        self.events_connected = False
 
         self.login_view()
 
     # ---------------- LOGIN ----------------
     def login_view(self):
+        self.page.scroll = ft.ScrollMode.ALWAYS
         self.logo = ft.Image(src="https://cdn-icons-png.flaticon.com/256/7590/7590241.png", width=250, height=250)
         self.username = ft.TextField(label="Username", expand=True)
         self.password = ft.TextField(label="Password", password=True, can_reveal_password=True, expand=True)
@@ -86,7 +259,7 @@ class ToDoApp:
         self.signup_message.value = ""
         self.page.open(self.signup_dialog)
 
-    def create_account(self, e):
+    async def create_account(self, e):
         username = self.signup_username.value.strip()
         password = self.signup_password.value.strip()
         if not username or not password:
@@ -95,18 +268,14 @@ class ToDoApp:
             return
 
         try:
-            response = httpx.post(f"{API_URL}/auth/signup", json={"username": username, "password": password})
+            response = await self.api.post("/auth/signup", json={"username": username, "password": password})
             if response.status_code == 200:
                 # login automático
-                token_resp = httpx.post(
-                    f"{API_URL}/auth/login",
-                    data={"username": username, "password": password},
-                    headers={"Content-Type": "application/x-www-form-urlencoded"}
-                )
+                token_resp = await self.api.login(username, password)
                 if token_resp.status_code == 200:
-                    self.token = token_resp.json()["access_token"]
+                    self.set_token(token_resp.json()["access_token"])
                     self.close_signup()
-                    self.load_todo_view()
+                    await self.load_todo_view()
                 else:
                     self.signup_message.value = "Erro ao logar automaticamente"
             else:
@@ -120,7 +289,7 @@ class ToDoApp:
         self.page.update()
 
     # ---------------- LOGIN ACTION ----------------
-    def login(self, e):
+    async def login(self, e):
         username = self.username.value.strip()
         password = self.password.value.strip()
         if not username or not password:
@@ -129,35 +298,27 @@ class ToDoApp:
             return
 
         try:
-            response = httpx.post(
-                f"{API_URL}/auth/login",
-                data={"username": username, "password": password},
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            )
+            response = await self.api.login(username, password)
             if response.status_code == 200:
-                self.token = response.json()["access_token"]
-                self.load_todo_view()
+                self.set_token(response.json()["access_token"])
+                await self.load_todo_view()
+            elif response.status_code == 429:
+                wait = response.headers.get("Retry-After", "alguns")
+                self.message.value = f"Muitas tentativas. Tente novamente em {wait} segundos."
             else:
                 self.message.value = "Usuário ou senha incorretos."
         except Exception as ex:
             self.message.value = f"Erro de conexão: {ex}"
         self.page.update()
 
-    # ---------------- TODO VIEW ----------------
-    def load_todo_view(self):
-        try:
-            headers = {"Authorization": f"Bearer {self.token}"}
-            resp = httpx.get(f"{API_URL}/users/me", headers=headers)
-            if resp.status_code == 200:
-                username = resp.json().get("username", "Usuário")
-            else:
-                username = "Usuário"
-        except Exception as ex:
-            print(f"Erro ao buscar usuário: {ex}")
-            username = "Usuário"
+    def set_token(self, token):
+        self.token = token
+        self.api.set_token(token)
 
+    # ---------------- TODO VIEW ----------------
+    async def load_todo_view(self):
         user_name_text = ft.Text(
-            value=f"Tarefas de, {username}!",
+            value="Tarefas de, Usuário!",
             weight=ft.FontWeight.BOLD,
             size=18
         )
@@ -170,8 +331,13 @@ class ToDoApp:
         )
 
         self.task_input = ft.TextField(hint_text="Nova tarefa", expand=True)
+        self.search_input = ft.TextField(hint_text="Buscar tarefas", prefix_icon=ft.Icons.SEARCH,
+                                         on_submit=self.search_changed, expand=True)
         add_btn = ft.FloatingActionButton(icon=ft.Icons.ADD, bgcolor=ft.Colors.GREEN, on_click=self.add_task)
-        self.tasks_container = ft.Column()
+        # Só a janela carregada vira controles; item_extent fixo evita medir cada linha
+        self.tasks_container = ft.ListView(expand=True, item_extent=ROW_HEIGHT,
+                                           on_scroll=self.on_scroll, on_scroll_interval=100)
+        self.rows = {}
 
         self.tabs = ft.Tabs(
             selected_index=0,
@@ -181,170 +347,420 @@ class ToDoApp:
                 ft.Tab(text="Em andamento"),
                 ft.Tab(text="Finalizadas"),
             ],
-            expand=1
         )
 
+        complete_all_btn = ft.TextButton("Concluir todas", icon=ft.Icons.DONE_ALL, on_click=self.complete_all)
+        clear_completed_btn = ft.TextButton("Limpar finalizadas", icon=ft.Icons.DELETE_SWEEP, on_click=self.delete_completed)
+
+        # Usuário e primeira página são independentes: as requisições saem juntas
+        me, loaded = await asyncio.gather(self.api.get("/users/me"), self.reload_window(reset=True),
+                                          return_exceptions=True)
+        if isinstance(me, httpx.Response) and me.status_code == 200:
+            user_name_text.value = f"Tarefas de, {me.json().get('username', 'Usuário')}!"
+        elif isinstance(me, Exception):
+            print(f"Erro ao buscar usuário: {me}")
+
+        self.page.scroll = None
         self.page.controls.clear()
         self.page.add(
             ft.Column(
                 controls=[
                     ft.Row([user_name_text, logout_btn], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
                     ft.Row([self.task_input, add_btn], spacing=10),
+                    ft.Row([self.search_input]),
                     self.tabs,
+                    ft.Row([complete_all_btn, clear_completed_btn], alignment=ft.MainAxisAlignment.END),
                     self.tasks_container
                 ],
                 expand=True
             )
         )
-        self.refresh_tasks()
-
-    def tabs_changed(self, e):
-        index = e.control.selected_index
-        if index == 0:
-            self.refresh_tasks()
-        elif index == 1:
-            self.refresh_tasks(status="incomplete")
-        elif index == 2:
-            self.refresh_tasks(status="complete")
-
-    def refresh_tasks(self, status=None):
-        try:
-            headers = {"Authorization": f"Bearer {self.token}"}
-            params = {"status": status} if status else {}
-            response = httpx.get(f"{API_URL}/tasks/", headers=headers, params=params)
-            if response.status_code == 200:
-                self.tasks = response.json()
-                self.update_tasks_ui()
-
-                # Atualiza contagem das abas
-                all_resp = httpx.get(f"{API_URL}/tasks/", headers=headers)
-                incomplete_resp = httpx.get(f"{API_URL}/tasks/", headers=headers, params={"status": "incomplete"})
-                complete_resp = httpx.get(f"{API_URL}/tasks/", headers=headers, params={"status": "complete"})
-
-                if all_resp.status_code == 200:
-                    self.tabs.tabs[0].text = f"Todos ({len(all_resp.json())})"
-                if incomplete_resp.status_code == 200:
-                    self.tabs.tabs[1].text = f"Em andamento ({len(incomplete_resp.json())})"
-                if complete_resp.status_code == 200:
-                    self.tabs.tabs[2].text = f"Finalizados ({len(complete_resp.json())})"
-
-                self.page.update()
+        if isinstance(loaded, Exception):
+            self.show_error(loaded)
+        else:
+            self.show_window()
+            self.show_stats()
+        self.events_task = asyncio.create_task(self.listen_events(self.token))
+
+    async def tabs_changed(self, e):
+        await self.refresh_list(reset=True)
+
+    async def search_changed(self, e):
+        await self.refresh_list(reset=True)
+
+    def current_status(self):
+        return [None, "incomplete", "complete"][self.tabs.selected_index]
+
+    def list_params(self):
+        params = {"limit": PAGE_SIZE}
+        if self.current_status():
+            params["status"] = self.current_status()
+        query = self.search_input.value.strip()
+        if query:
+            params["q"] = query
+        return params
+
+    # ---------------- JANELA DE PÁGINAS ----------------
+    # pages: páginas carregadas, contíguas; cursors: cursor de início de cada página já vista
+    # (o da página 0 é None), guardados para buscar de novo as que forem descartadas
+    def reset_list(self):
+        self.params = {}
+        self.pages = []
+        self.cursors = [None]
+        self.first_page = 0
+
+    def has_more(self):
+        return bool(self.pages) and self.pages[-1]["next"] is not None
+
+    async def fetch_page(self, index, old=None):
+        # Com If-None-Match uma página inalterada volta como 304 sem corpo
+        params = dict(self.params)
+        if self.cursors[index]:
+            params["cursor"] = self.cursors[index]
+        headers = {"If-None-Match": old["etag"]} if old and old["etag"] else {}
+        response = await self.api.get("/tasks/", params=params, headers=headers)
+        if response.status_code == 304:
+            return old
+        response.raise_for_status()
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if next_cursor:
+            self.cursors[index + 1:index + 2] = [next_cursor]
+        return {"tasks": response.json(), "etag": response.headers.get("ETag"), "next": next_cursor,
+                "token": int(response.headers.get("X-Sync-Token", 0))}
+
+    async def fetch_stats(self):
+        headers = {"If-None-Match": self.stats_etag} if self.stats_etag else {}
+        response = await self.api.get("/tasks/stats", headers=headers)
+        if response.status_code == 304:
+            return
+        response.raise_for_status()
+        self.stats, self.stats_etag = response.json(), response.headers.get("ETag")
+
+    async def reload_window(self, reset=False):
+        # Busca de novo as páginas carregadas (ou só a primeira, com filtro novo)
+        if reset or not self.pages or self.params != self.list_params():
+            self.reset_list()
+            self.params = self.list_params()
+            pages = [None]
+        else:
+            pages = self.pages
+        _, *self.pages = await asyncio.gather(
+            self.fetch_stats(), *(self.fetch_page(self.first_page + i, page) for i, page in enumerate(pages)))
+        # A menor versão entre as páginas: o que veio depois dela é reaplicado sem efeito
+        self.sync_token = min(page["token"] for page in self.pages)
+
+    async def sync_window(self):
+        # Delta desde o token aplicado às páginas carregadas; na busca (ordem por relevância)
+        # ou se o servidor não tem mais o histórico, busca de novo a janela
+        if self.params.get("q") or not self.sync_token:
+            await self.reload_window()
+            return
+        response = await self.api.get("/tasks/changes", params={"since": self.sync_token})
+        response.raise_for_status()
+        changes = response.json()
+        if changes["reset"] or not self.apply_changes(changes):
+            await self.reload_window()
+        else:
+            await self.fetch_stats()
+
+    def apply_changes(self, changes):
+        # Atualiza/remove as tasks que estão na janela e acrescenta as novas do fim da lista.
+        # False: uma task entrou no meio da janela (ex.: mudou para o status da aba) -> recarregar
+        status = self.params.get("status")
+        searching = "q" in self.params
+        loaded = {t["id"] for page in self.pages for t in page["tasks"]}
+        gone = set(changes["deleted"])
+        updated = {}
+        for t in changes["tasks"]:
+            if status and t["status"] != status:
+                gone.add(t["id"])
+            elif t["id"] in loaded:
+                updated[t["id"]] = t
+            elif not searching and self.pages:
+                last = self.pages[-1]["tasks"][-1] if self.pages[-1]["tasks"] else None
+                if last is None or (t["created_at"], t["id"]) > (last["created_at"], last["id"]):
+                    if self.has_more():
+                        continue  # depois da janela: vem quando o usuário rolar até lá
+                    self.pages[-1]["tasks"].append(t)
+                elif self.first_page == 0 or (t["created_at"], t["id"]) > self.window_start_key():
+                    return False
+        for page in self.pages:
+            page["tasks"] = [updated.get(t["id"], t) for t in page["tasks"] if t["id"] not in gone]
+        self.sync_token = changes["token"]
+        return True
+
+    def window_start_key(self):
+        first = next((page["tasks"][0] for page in self.pages if page["tasks"]), None)
+        return (first["created_at"], first["id"]) if first else ("", 0)
+
+    async def refresh_list(self, reset=False, reload=False, keep_on_error=False):
+        # Padrão: delta-sync da janela; reload busca de novo as páginas, reset volta ao topo.
+        # keep_on_error: falhando, a lista atual fica na tela em vez da mensagem de erro
+        async with self.sync_lock:
+            try:
+                if reset or reload:
+                    await self.reload_window(reset=reset)
+                else:
+                    await self.sync_window()
+                self.show_window()
+                self.show_stats()
+            except Exception as ex:
+                if keep_on_error:
+                    print(f"Erro ao buscar tasks: {ex}")
+                else:
+                    self.show_error(ex)
 
+    # ---------------- ROLAGEM ----------------
+    async def on_scroll(self, e: ft.OnScrollEvent):
+        if self.sync_lock.locked() or not self.pages:
+            return
+        if e.pixels >= e.max_scroll_extent - PREFETCH_PX and self.has_more():
+            await self.load_page(next_page=True)
+        elif e.pixels <= PREFETCH_PX and self.first_page > 0:
+            await self.load_page(next_page=False)
+
+    async def load_page(self, next_page):
+        # Carrega a página seguinte (ou a anterior) e, passando de MAX_PAGES, descarta a do
+        # lado oposto; a rolagem é corrigida pelas linhas que entraram/saíram acima da tela
+        async with self.sync_lock:
+            index = self.first_page + len(self.pages) if next_page else self.first_page - 1
+            try:
+                page = await self.fetch_page(index)
+            except Exception as ex:
+                print(f"Erro ao carregar página: {ex}")
+                return
+            shift = 0
+            if next_page:
+                self.pages.append(page)
+                if len(self.pages) > MAX_PAGES:
+                    shift -= len(self.pages.pop(0)["tasks"])
+                    self.first_page += 1
+            else:
+                self.pages.insert(0, page)
+                self.first_page -= 1
+                shift += len(page["tasks"])
+                if len(self.pages) > MAX_PAGES:
+                    self.pages.pop()
+            self.show_window()
+            if shift:
+                self.tasks_container.scroll_to(delta=shift * ROW_HEIGHT, duration=0)
+
+    # ---------------- EVENTOS ----------------
+    # Canal SSE com as mutações do usuário (desta e de outras sessões), aplicadas à janela carregada
+    # Task cancelada no logout
+    async def listen_events(self, token):
+        while self.token == token:
+            try:
+                async with self.api.stream("GET", "/tasks/events") as response:
+                    if response.status_code == 401:
+                        return
+                    event, data = None, []
+                    async for line in response.aiter_lines():
+                        if line.startswith("event:"):
+                            event = line[6:].strip()
+                        elif line.startswith("data:"):
+                            data.append(line[5:].strip())
+                        elif not line:
+                            if event == "ready":
+                                # Inscrito: ressincroniza o que pode ter mudado enquanto estava desconectado
+                                self.events_connected = True
+                                await self.refresh_list()
+                            elif event == "tasks" and data:
+                                await self.apply_event(json.loads("\n".join(data)))
+                            elif event == "resync" and data:
+                                await self.apply_event({**json.loads("\n".join(data)), "resync": True})
+                            event, data = None, []
+            except Exception as ex:
+                print(f"Erro no canal de eventos: {ex}")
+            finally:
+                self.events_connected = False
+            await asyncio.sleep(3)
+
+    async def apply_event(self, changes):
+        async with self.sync_lock:
+            try:
+                if changes["token"] <= self.sync_token:
+                    return
+                if (not changes.get("resync") and not changes["reset"] and changes["token"] == self.sync_token + 1
+                        and self.apply_changes(changes)):
+                    await self.fetch_stats()
+                else:
+                    # Lacuna (evento perdido ou fora de ordem) ou evento sem as tasks (resync, ex.:
+                    # importação em lote): busca o delta no servidor
+                    await self.sync_window()
+                self.show_window()
+                self.show_stats()
+            except Exception as ex:
+                self.show_error(ex)
+
+    async def after_write(self):
+        # Com o canal de eventos ativo a mudança chega por ele; sem, busca o delta
+        if not self.events_connected:
+            await self.refresh_list()
+
+    # ---------------- ATUALIZAÇÃO OTIMISTA ----------------
+    def set_local(self, task, previous, removed=False):
+        # Aplica a mudança na janela, nas contagens e na tela sem ir ao servidor; as páginas
+        # e contagens perdem o ETag para não voltarem como 304 com o valor otimista
+        status = self.params.get("status")
+        keep = not removed and status in (None, task["status"])
+        for page in self.pages:
+            page["tasks"] = [task if t["id"] == task["id"] else t for t in page["tasks"]
+                             if t["id"] != task["id"] or keep]
+            page["etag"] = None
+        self.stats[previous["status"]] -= 1
+        if not removed:
+            self.stats[task["status"]] += 1
+        self.stats["total"] = self.stats["incomplete"] + self.stats["complete"]
+        self.stats_etag = None
+        self.show_window()
+        self.show_stats()
+
+    async def optimistic_write(self, task, request, removed=False):
+        # A tela muda na hora; se a API falhar a mudança é desfeita localmente e a janela é
+        # buscada de novo (o delta viria vazio), mantendo a lista restaurada se a rede caiu
+        previous = next((t for t in self.tasks if t["id"] == task["id"]), None)
+        if previous is None:
+            # a linha saiu da janela (evento de outro cliente) antes do clique ser tratado
+            request.close()
+            return False
+        saved = [(page, page["tasks"]) for page in self.pages]
+        stats, saved_stats = self.stats, dict(self.stats)
+        self.set_local(task, previous, removed)
+        try:
+            response = await request
+            ok = response.status_code == 200
         except Exception as ex:
-            self.tasks_container.controls.clear()
-            self.tasks_container.controls.append(ft.Text(f"Erro ao buscar tasks: {ex}", color=ft.Colors.RED))
-            self.page.update()
+            print(f"Erro ao salvar task: {ex}")
+            ok = False
+        if ok:
+            await self.after_write()
+        else:
+            self.restore_local(saved, stats, saved_stats)
+            await self.refresh_list(reload=True, keep_on_error=True)
+        return ok
+
+    def restore_local(self, saved, stats, saved_stats):
+        # Desfaz set_local nas páginas e contagens que ainda são as mesmas (uma recarga no
+        # meio já trouxe o estado do servidor)
+        for page, tasks in saved:
+            if page in self.pages:
+                page["tasks"] = tasks
+        if self.stats is stats:
+            stats.update(saved_stats)
+        self.show_window()
+        self.show_stats()
+
+    def show_window(self):
+        # Uma task pode aparecer em duas páginas buscadas em versões diferentes
+        seen = set()
+        self.tasks = [t for page in self.pages for t in page["tasks"]
+                      if t["id"] not in seen and not seen.add(t["id"])]
+        self.update_tasks_ui()
+
+    def show_stats(self):
+        stats = self.stats
+        labels = [f"Todos ({stats['total']})", f"Em andamento ({stats['incomplete']})",
+                  f"Finalizados ({stats['complete']})"]
+        if [tab.text for tab in self.tabs.tabs] != labels:
+            for tab, label in zip(self.tabs.tabs, labels):
+                tab.text = label
+            self.tabs.update()
+
+    def show_error(self, ex):
+        self.rows = {}
+        self.tasks_container.controls = [ft.Text(f"Erro ao buscar tasks: {ex}", color=ft.Colors.RED)]
+        self.tasks_container.update()
 
     def update_tasks_ui(self):
-        self.tasks_container.controls.clear()
-
+        # Reconciliação por id: cria só as linhas novas, descarta as removidas e atualiza as
+        # alteradas; o Flet envia ao navegador apenas o que mudou
+        ids = [t["id"] for t in self.tasks]
+        wanted = set(ids)
+        for task_id in [i for i in self.rows if i not in wanted]:
+            del self.rows[task_id]
+
+        changed = []
         for t in self.tasks:
-            # campo de texto da tarefa
-            task_field = ft.TextField(
-                value=t["name"],
-                expand=True,
-                border=ft.InputBorder.NONE,
-                read_only=True
-            )
-
-            # checkbox de status
-            cb = ft.Checkbox(
-                value=t["status"] == "complete",
-                on_change=lambda e, task=t: self.toggle_status(e, task)
-            )
-
-            # botão editar
-            def toggle_edit(e, task=t, field=task_field):
-                if field.read_only:
-                    field.read_only = False
-                    field.border = ft.InputBorder.OUTLINE
-                    e.control.icon = ft.Icons.SAVE
-                else:
-                    field.read_only = True
-                    field.border = ft.InputBorder.NONE
-                    e.control.icon = ft.Icons.EDIT
-                    self.edit_task(task["id"], field.value)
-                self.page.update()
-
-            edit_btn = ft.IconButton(
-                icon=ft.Icons.EDIT,
-                icon_color=ft.Colors.BLUE,
-                tooltip="Editar",
-                on_click=toggle_edit
-            )
-
-            del_btn = ft.IconButton(
-                icon=ft.Icons.DELETE,
-                icon_color=ft.Colors.RED,
-                tooltip="Excluir",
-                on_click=lambda e, task_id=t["id"]: self.delete_task(task_id)
-            )
-
-            self.tasks_container.controls.append(
-                ft.Card(
-                    content=ft.Row(
-                        [cb, task_field, edit_btn, del_btn],
-                        alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
-                    ),
-                    elevation=2,
-                    margin=5,
-                )
-                
-            )
-
-        self.page.update()
-
-    def edit_task(self, task_id, new_name):
-        try:
-            headers = {"Authorization": f"Bearer {self.token}"}
-            response = httpx.put(
-                f"{API_URL}/tasks/{task_id}",
-                json={"name": new_name},
-                headers=headers
-            )
-            if response.status_code == 200:
-                self.refresh_tasks()
-        except Exception as ex:
-            print(f"Erro ao editar task: {ex}")
+            row = self.rows.get(t["id"])
+            if row is None:
+                self.rows[t["id"]] = TaskRow(self, t)
+            elif row.task != t:
+                row.set_task(t)
+                changed.append(row)
+
+        controls = [self.rows[i].card for i in ids]
+        if controls != self.tasks_container.controls:
+            # linhas entraram, saíram ou mudaram de posição
+            self.tasks_container.controls = controls
+            self.tasks_container.update()
+        else:
+            for row in changed:
+                row.card.update()
+
+    async def edit_task(self, task_id, new_name):
+        task = next((t for t in self.tasks if t["id"] == task_id), None)
+        if task is None:
+            return
+        await self.optimistic_write({**task, "name": new_name},
+                                    self.api.put(f"/tasks/{task_id}", json={"name": new_name}))
 
-    def add_task(self, e):
+    async def add_task(self, e):
         name = self.task_input.value.strip()
         if not name:
             return
         try:
-            headers = {"Authorization": f"Bearer {self.token}"}
-            response = httpx.post(f"{API_URL}/tasks/", json={"name": name}, headers=headers)
+            response = await self.api.post("/tasks/", json={"name": name})
             if response.status_code == 200:
                 self.task_input.value = ""
-                self.refresh_tasks()
+                self.task_input.update()
+                await self.after_write()
         except Exception as ex:
             print(f"Erro ao adicionar task: {ex}")
 
-    def delete_task(self, task_id):
+    async def delete_task(self, task_id):
+        task = next((t for t in self.tasks if t["id"] == task_id), None)
+        if task is None:
+            return
+        await self.optimistic_write(task, self.api.delete(f"/tasks/{task_id}"), removed=True)
+
+    async def toggle_status(self, e, task):
+        new_status = "complete" if e.control.value else "incomplete"
+        await self.optimistic_write({**task, "status": new_status},
+                                    self.api.put(f"/tasks/{task['id']}", json={"status": new_status}))
+    
+    # ações em lote: uma única requisição para todas as tasks do usuário
+    async def complete_all(self, e):
         try:
-            headers = {"Authorization": f"Bearer {self.token}"}
-            response = httpx.delete(f"{API_URL}/tasks/{task_id}", headers=headers)
+            response = await self.api.post("/tasks/complete-all")
             if response.status_code == 200:
-                self.refresh_tasks()
+                await self.after_write()
         except Exception as ex:
-            print(f"Erro ao deletar task: {ex}")
+            print(f"Erro ao concluir tasks: {ex}")
 
-    def toggle_status(self, e, task):
+    async def delete_completed(self, e):
         try:
-            headers = {"Authorization": f"Bearer {self.token}"}
-            new_status = "complete" if e.control.value else "incomplete"
-            response = httpx.put(f"{API_URL}/tasks/{task['id']}", json={"status": new_status}, headers=headers)
+            response = await self.api.delete("/tasks/completed")
             if response.status_code == 200:
-                self.refresh_tasks()
+                await self.after_write()
         except Exception as ex:
-            print(f"Erro ao atualizar task: {ex}")
-    
+            print(f"Erro ao limpar tasks finalizadas: {ex}")
+
     def logout(self, e):
-        self.token = None
+        if self.events_task:
+            self.events_task.cancel()
+            self.events_task = None
+        self.set_token(None)
         self.tasks = []
+        self.rows = {}
+        self.reset_list()
+        self.stats_etag = None
+        self.sync_token = 0
+        self.events_connected = False
         self.login_view()
 
 def main(page: ft.Page):
     ToDoApp(page)
 
-ft.app(target=main, assets_dir='assets', view=ft.WEB_BROWSER)
+if __name__ == "__main__":
+    ft.app(target=main, assets_dir='assets', view=ft.WEB_BROWSER)
@@ -0,0 +1,39 @@
+import os
+
+# Antes de importar todo.backend: as configurações do hash de senhas são lidas no import
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("HASH_WORKERS", "0")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from todo.backend import settings
+from todo.backend.main import create_app
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    # Instância isolada por teste: banco próprio e sem os jobs periódicos
+    def make_app(**values):
+        values = {"DATABASE_URL": f"sqlite:///{tmp_path}/todo.db", "ARCHIVE_INTERVAL_SECONDS": 0,
+                  "TOMBSTONE_COMPACT_INTERVAL_SECONDS": 0, **values}
+        return create_app(settings.override(**values))
+    return make_app
+
+
+@pytest.fixture(params=[False, True], ids=["sync", "async"])
+def client(request, make_app):
+    # Rotas síncronas e, com ASYNC_DB, as de aio.py
+    with TestClient(make_app(ASYNC_DB=request.param)) as client:
+        yield client
+
+
+def login(client, username="alice", password="secret") -> dict:
+    client.post("/auth/signup", json={"username": username, "password": password})
+    resp = client.post("/auth/login", data={"username": username, "password": password})
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+@pytest.fixture
+def auth(client):
+    return login(client)
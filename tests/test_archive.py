@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from todo.backend import crud, models
+
+
+@pytest.fixture
+def archived(client, auth):
+    # Três tasks concluídas arquivadas e uma viva (a de maior id nunca é arquivada)
+    ids = [t["id"] for t in client.post("/tasks/batch", json=[{"name": f"t{i}"} for i in range(4)], headers=auth).json()]
+    client.post("/tasks/complete-all", headers=auth)
+    database = client.app.state.database
+    with database.SessionLocal() as db:
+        assert crud.archive_tasks(db, datetime.utcnow() + timedelta(seconds=1), 100) == 3
+        db.commit()
+    return ids[:3]
+
+
+def listed(client, auth, **params):
+    return [t["id"] for t in client.get("/tasks/", params={"include_archived": True, **params}, headers=auth).json()]
+
+
+def deleted_since(client, auth, token):
+    return client.get("/tasks/changes", params={"since": token}, headers=auth).json()
+
+
+def test_delete_completed_removes_archived(client, auth, archived):
+    token = int(client.get("/tasks/", headers=auth).headers["X-Sync-Token"])
+    assert client.delete("/tasks/completed", headers=auth).json() == {"count": 4}
+    assert listed(client, auth) == []
+    assert client.get("/tasks/export", headers=auth).text == ""
+    changes = deleted_since(client, auth, token)
+    assert set(archived) <= set(changes["deleted"])
+
+
+def test_delete_archived_by_id(client, auth, archived):
+    resp = client.post("/tasks/batch/delete", json={"ids": [archived[0], 999]}, headers=auth).json()
+    assert [r["ok"] for r in resp] == [True, False]
+    assert client.delete(f"/tasks/{archived[1]}", headers=auth).status_code == 200
+    assert client.delete(f"/tasks/{archived[1]}", headers=auth).status_code == 404
+    assert archived[0] not in listed(client, auth) and archived[1] not in listed(client, auth)
+    with client.app.state.database.SessionLocal() as db:
+        tombstones = db.query(models.Task).filter(models.Task.id.in_(archived[:2])).all()
+    assert all(t.deleted_at is not None for t in tombstones) and len(tombstones) == 2
+
+
+def test_update_unarchives(client, auth, archived):
+    token = int(client.get("/tasks/", headers=auth).headers["X-Sync-Token"])
+    resp = client.put(f"/tasks/{archived[0]}", json={"status": "incomplete"}, headers=auth)
+    assert resp.status_code == 200 and resp.json()["status"] == "incomplete"
+    assert archived[0] in [t["id"] for t in client.get("/tasks/", headers=auth).json()]
+    assert [t["id"] for t in deleted_since(client, auth, token)["tasks"]] == [archived[0]]
+
+    resp = client.put("/tasks/batch", json=[{"id": archived[1], "name": "renamed"}, {"id": archived[2]}], headers=auth)
+    assert [r["ok"] for r in resp.json()] == [True, False]
+    live = {t["id"]: t for t in client.get("/tasks/", headers=auth).json()}
+    assert live[archived[1]]["name"] == "renamed" and archived[2] not in live
+    assert archived[2] in listed(client, auth)
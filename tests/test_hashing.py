@@ -0,0 +1,21 @@
+from fastapi.testclient import TestClient
+
+from conftest import login
+
+# Cada app tem o próprio pool do bcrypt: encerrar um (fim do lifespan) não cancela os hashes
+# dos outros no mesmo processo
+
+
+def test_closing_one_app_keeps_the_other_pool(tmp_path, make_app):
+    first = make_app(HASH_WORKERS=1)
+    second = make_app(DATABASE_URL=f"sqlite:///{tmp_path}/second.db", HASH_WORKERS=1)
+    with TestClient(second) as client:
+        with TestClient(first) as other:
+            login(other)
+            assert first.state.database.hashing_pool is not second.state.database.hashing_pool
+        assert first.state.database.hashing_pool._executor is None
+        headers = login(client)
+        pool = second.state.database.hashing_pool
+        assert pool._executor is not None
+        assert client.get("/users/me", headers=headers).json()["username"] == "alice"
+    assert pool._executor is None
@@ -0,0 +1,76 @@
+import pytest
+
+from todo.backend.crud import TaskImportError, TaskImportParser
+
+
+def parse(body: bytes, format: str = "csv", chunk: int = 3, **options) -> list[dict]:
+    # Pedaços pequenos: registros e linhas chegam partidos em vários feeds
+    parser = TaskImportParser(format, **options)
+    rows = []
+    for start in range(0, len(body), chunk):
+        rows += parser.feed(body[start:start + chunk])
+    return rows + parser.close()
+
+
+@pytest.mark.parametrize("chunk", [1, 3, 1 << 16])
+def test_csv_quotes_and_newlines(chunk):
+    body = ('﻿name,status\n'
+            '5" screws,incomplete\n'
+            '"multi\r\nline",complete\r\n'
+            '\n'
+            '"say ""hi""",\n').encode()
+    rows = parse(body, chunk=chunk)
+    assert [(r["name"], r["status"]) for r in rows] == [
+        ('5" screws', "incomplete"), ("multi\r\nline", "complete"), ('say "hi"', "incomplete")]
+
+
+def test_csv_bom_header():
+    assert [r["name"] for r in parse("﻿name\nx\n".encode())] == ["x"]
+
+
+def test_csv_error_row_number():
+    body = b'name,created_at\n"a\nb",\nc,2024-01-01T00:00:00\nd,yesterday\n'
+    with pytest.raises(TaskImportError) as exc:
+        parse(body)
+    assert exc.value.row == 3
+
+
+def test_csv_unterminated_quote():
+    with pytest.raises(TaskImportError, match="unterminated") as exc:
+        parse(b'name\nok\n"never closed\nx\n')
+    assert exc.value.row == 2
+
+
+@pytest.mark.parametrize("format, body", [
+    ("csv", b'name\n"' + b"x\n" * 100),
+    ("ndjson", b'{"name": "a"}\n' + b"x" * 200),
+])
+def test_pending_row_is_capped(format, body):
+    with pytest.raises(TaskImportError, match="longer than"):
+        parse(body, format, chunk=16, max_row=64)
+
+
+def test_ndjson_error_row_number():
+    with pytest.raises(TaskImportError) as exc:
+        parse(b'{"name": "a"}\n\n{"name": ""}\n', "ndjson")
+    assert exc.value.row == 2
+
+
+def test_import_route(client, auth):
+    body = 'name,status\n5" screws,complete\n"two\nlines",\n'.encode()
+    resp = client.post("/tasks/import", content=body, headers={**auth, "Content-Type": "text/csv"})
+    assert resp.json() == {"count": 2}
+    assert [t["name"] for t in client.get("/tasks/", headers=auth).json()] == ['5" screws', "two\nlines"]
+    resp = client.post("/tasks/import?format=csv", content=b"name\nok\n\"open\n", headers=auth)
+    assert resp.status_code == 422 and resp.json()["detail"]["row"] == 2
+
+
+def test_import_publishes_resync(client, auth, monkeypatch):
+    # O evento da importação não é um TaskChanges (reset=true seria "lista completa vazia")
+    published = []
+    monkeypatch.setattr(client.app.state.database.broker, "publish",
+                        lambda owner_id, message: published.append(message))
+    client.post("/tasks/", json={"name": "a"}, headers=auth)
+    client.post("/tasks/import", content=b'{"name": "b"}\n{"name": "c"}\n', headers=auth)
+    assert published[0].startswith("event: tasks\ndata: ")
+    assert published[1] == 'event: resync\ndata: {"token":2}\n\n'
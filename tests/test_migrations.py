@@ -0,0 +1,57 @@
+import pytest
+from sqlalchemy import create_engine, inspect
+
+from todo.backend import migrations, models
+
+# As migrações têm DDL próprio (não leem models): o schema que produzem precisa continuar
+# igual ao dos modelos, tanto num banco novo quanto num banco antigo (versão 1)
+
+
+def schema(engine) -> dict:
+    inspector = inspect(engine)
+    tables = {}
+    for table in inspector.get_table_names():
+        if table == "schema_version" or table.startswith("tasks_fts"):
+            continue
+        tables[table] = {
+            "columns": sorted((c["name"], str(c["type"]), c["nullable"], bool(c["primary_key"]))
+                              for c in inspector.get_columns(table)),
+            "foreign_keys": sorted((tuple(fk["constrained_columns"]), fk["referred_table"])
+                                   for fk in inspector.get_foreign_keys(table)),
+            "indexes": sorted((ix["name"], tuple(ix["column_names"]), bool(ix["unique"]),
+                               str(ix.get("dialect_options", {}).get("sqlite_where")))
+                              for ix in inspector.get_indexes(table)),
+        }
+    return tables
+
+
+@pytest.fixture
+def expected(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/models.db")
+    models.Base.metadata.create_all(bind=engine)
+    yield schema(engine)
+    engine.dispose()
+
+
+def test_new_database_matches_models(tmp_path, expected):
+    engine = create_engine(f"sqlite:///{tmp_path}/todo.db")
+    assert migrations.migrate(engine) == migrations.LATEST_VERSION
+    assert schema(engine) == expected
+
+
+def test_version_1_database_matches_models(tmp_path, expected):
+    # Banco de antes das migrações: sem schema_version, só com as tabelas originais
+    engine = create_engine(f"sqlite:///{tmp_path}/todo.db")
+    with engine.begin() as conn:
+        migrations._baseline(conn)
+        conn.exec_driver_sql("INSERT INTO users (id, username, hashed_password) VALUES (1, 'alice', 'x')")
+        conn.exec_driver_sql("INSERT INTO tasks (id, name, status, created_at, owner_id) "
+                             "VALUES (1, 'old', 'incomplete', '2024-01-01 00:00:00', 1)")
+    assert migrations.migrate(engine) == migrations.LATEST_VERSION
+    assert schema(engine) == expected
+    with engine.connect() as conn:
+        task = conn.exec_driver_sql("SELECT name, updated_at, version, deleted_at FROM tasks").one()
+        assert tuple(task) == ("old", "2024-01-01 00:00:00", 0, None)
+        assert conn.exec_driver_sql("SELECT moving FROM users").scalar() == 0
+        hits = conn.exec_driver_sql("SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH 'old'").all()
+        assert hits == [(1,)]
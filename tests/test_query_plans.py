@@ -0,0 +1,45 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+
+from todo.backend import crud, migrations
+
+# As consultas quentes das listagens precisam usar os índices compostos (parciais, só tasks
+# vivas) e sair já ordenadas, sem "USE TEMP B-TREE"
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans')}/todo.db")
+    migrations.migrate(engine)
+    yield engine
+    engine.dispose()
+
+
+def query_plan(engine, stmt) -> list[str]:
+    sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+CURSOR = crud.encode_cursor(SimpleNamespace(created_at=datetime(2024, 1, 1), id=5))
+
+QUERIES = {
+    "list": (lambda: crud.task_rows(crud.tasks_select(1)), "ix_tasks_owner_created"),
+    "list_status": (lambda: crud.task_rows(crud.tasks_select(1, "incomplete")), "ix_tasks_owner_status_created"),
+    "keyset_page": (lambda: crud.task_rows(crud.tasks_select(1, None, CURSOR)).limit(50), "ix_tasks_owner_created"),
+    "keyset_page_status": (lambda: crud.task_rows(crud.tasks_select(1, "complete", CURSOR)).limit(50),
+                           "ix_tasks_owner_status_created"),
+    "stats": (lambda: crud.stats_select(1), "ix_tasks_owner_status_created"),
+}
+
+
+@pytest.mark.parametrize("name", QUERIES)
+def test_hot_queries_use_index(engine, name):
+    build, index = QUERIES[name]
+    plan = query_plan(engine, build())
+    assert any(f"INDEX {index} " in step for step in plan), plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+    assert not any(step.startswith("SCAN tasks") for step in plan), plan
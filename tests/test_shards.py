@@ -0,0 +1,64 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from todo.backend import models, shards
+
+from conftest import login
+
+
+@pytest.fixture(params=[False, True], ids=["sync", "async"])
+def sharded(request, make_app, tmp_path, monkeypatch):
+    # Cache do shard de 1 s, que o move espera (sem a folga)
+    monkeypatch.setattr(shards, "MOVE_GRACE_SECONDS", 0)
+    app = make_app(SHARDS=2, SHARD_URL=f"sqlite:///{tmp_path}/shard-{{shard}}.db", SHARD_CACHE_TTL_SECONDS=1,
+                   ASYNC_DB=request.param)
+    with TestClient(app) as client:
+        yield client
+
+
+def names(client, auth):
+    return [t["name"] for t in client.get("/tasks/", headers=auth).json()]
+
+
+def test_open_database_takes_overrides(sharded):
+    database = shards.open_database(sharded.app.state.settings)
+    assert len(database.shards) == 2
+    database = shards.open_database({**vars(sharded.app.state.settings), "SHARDS": 3})
+    assert len(database.shards) == 3
+
+
+def test_move_while_serving(sharded):
+    auth = login(sharded)
+    user_id = sharded.get("/users/me", headers=auth).json()["id"]
+    sharded.post("/tasks/batch", json=[{"name": "a"}, {"name": "b"}], headers=auth)
+    database = shards.open_database(sharded.app.state.settings)
+    with database.SessionLocal() as db:
+        source = db.get(models.User, user_id).shard
+
+    assert shards.move_user(database, user_id, 1 - source) == 2
+    # A instância no ar passa a usar o shard novo, inclusive para escrever
+    assert names(sharded, auth) == ["a", "b"]
+    sharded.post("/tasks/", json={"name": "c"}, headers=auth)
+    with database.shards[1 - source].SessionLocal() as db:
+        assert db.query(models.Task).filter(models.Task.deleted_at.is_(None)).count() == 3
+    with database.shards[source].SessionLocal() as db:
+        assert db.query(models.Task).filter(models.Task.deleted_at.is_(None)).count() == 0
+
+
+def test_moving_user_gets_503(sharded):
+    auth = login(sharded)
+    database = sharded.app.state.database
+    user_id = sharded.get("/users/me", headers=auth).json()["id"]
+    database.owner_shards.clear()
+    with database.SessionLocal() as db:
+        db.get(models.User, user_id).moving = True
+        db.commit()
+    resp = sharded.post("/tasks/", json={"name": "lost"}, headers=auth)
+    assert resp.status_code == 503 and resp.headers["Retry-After"] == "1"
+    assert sharded.get("/tasks/", headers=auth).status_code == 503
+    # Um move para o shard onde já está só desmarca
+    with database.SessionLocal() as db:
+        shard = db.get(models.User, user_id).shard
+    assert shards.move_user(shards.open_database(sharded.app.state.settings), user_id, shard) == 0
+    database.owner_shards.clear()
+    assert names(sharded, auth) == []
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from todo.backend import throttle
+from todo.backend.throttle import LoginThrottle, MemoryThrottle, ThrottleBackend
+
+from conftest import login
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(throttle.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        ThrottleBackend()
+
+
+def test_sliding_window(clock):
+    backend = MemoryThrottle(max_keys=10)
+    acquire = lambda: asyncio.run(backend.acquire("k", 2, 60))
+    assert acquire() == 0
+    clock[0] += 10
+    assert acquire() == 0
+    # Cheia: espera até a mais antiga (t=1000) sair da janela
+    clock[0] += 20
+    assert acquire() == pytest.approx(30)
+    # Só a primeira saiu: abre uma vaga, a de t=1010 continua contando
+    clock[0] += 30
+    assert acquire() == 0
+    assert acquire() == pytest.approx(10)
+
+
+def test_lru_evicts_least_recent_key(clock):
+    backend = MemoryThrottle(max_keys=2)
+    acquire = lambda key: asyncio.run(backend.acquire(key, 1, 60))
+    assert acquire("a") == 0
+    assert acquire("b") == 0
+    # "a" é tocada (bloqueada) e passa a ser a mais recente; "c" tira "b" do LRU
+    assert acquire("a") > 0
+    assert acquire("c") == 0
+    assert list(backend._attempts) == ["a", "c"]
+    assert acquire("b") == 0
+    assert acquire("a") == 0
+
+
+@pytest.mark.parametrize("error, kept", [
+    (HTTPException(status_code=401), 1),
+    (HTTPException(status_code=503), 0),
+    (RuntimeError("database down"), 0),
+])
+def test_attempt_releases_on_server_errors(clock, error, kept):
+    backend = MemoryThrottle(max_keys=10)
+    login_throttle = LoginThrottle(backend, ip_limit=5, user_limit=5, window=60)
+
+    async def attempt():
+        async with login_throttle.attempt("alice", "10.0.0.1"):
+            raise error
+
+    with pytest.raises(type(error)):
+        asyncio.run(attempt())
+    assert [len(attempts) for attempts in backend._attempts.values()] == [kept, kept]
+
+
+def test_blocked_user_releases_ip(clock):
+    backend = MemoryThrottle(max_keys=10)
+    login_throttle = LoginThrottle(backend, ip_limit=5, user_limit=1, window=60)
+    asyncio.run(login_throttle.acquire("alice", "10.0.0.1"))
+    with pytest.raises(HTTPException):
+        asyncio.run(login_throttle.acquire("alice", "10.0.0.1"))
+    assert len(backend._attempts["ip:10.0.0.1"]) == 1
+
+
+@pytest.mark.parametrize("async_db", [False, True], ids=["sync", "async"])
+def test_login_returns_429_with_retry_after(make_app, async_db):
+    with TestClient(make_app(ASYNC_DB=async_db, LOGIN_USER_MAX_ATTEMPTS=2,
+                             LOGIN_THROTTLE_WINDOW_SECONDS=300)) as client:
+        login(client)
+        bad = {"username": "alice", "password": "wrong"}
+        assert [client.post("/auth/login", data=bad).status_code for _ in range(2)] == [401, 401]
+        resp = client.post("/auth/login", data=bad)
+        assert resp.status_code == 429
+        assert 0 < int(resp.headers["Retry-After"]) <= 300
+        # Bloqueado antes do bcrypt: nem a senha certa passa até a janela andar
+        resp = client.post("/auth/login", data={"username": "alice", "password": "secret"})
+        assert resp.status_code == 429
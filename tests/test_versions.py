@@ -0,0 +1,36 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql, sqlite
+
+from todo.backend import crud
+
+from conftest import login
+
+
+@pytest.mark.parametrize("dialect", [sqlite.dialect(), postgresql.dialect()], ids=["sqlite", "postgresql"])
+def test_bump_version_is_one_upsert(dialect):
+    sql = str(crud.version_upsert(1, dialect.name).compile(dialect=dialect))
+    assert "ON CONFLICT (owner_id) DO UPDATE SET version = (task_versions.version +" in sql
+    assert re.search(r"RETURNING (task_versions\.)?version$", sql)
+
+
+def test_concurrent_first_writes(make_app):
+    # Sem o writer (GROUP_COMMIT=False) cada requisição cria/incrementa a versão na própria transação
+    with TestClient(make_app(GROUP_COMMIT=False)) as client:
+        auth = login(client)
+        owner_id = client.get("/users/me", headers=auth).json()["id"]
+        database = client.app.state.database
+
+        def create(i):
+            with database.SessionLocal() as db:
+                task = crud.create_task(db, owner_id, f"task {i}")
+                db.commit()
+                return task.version
+
+        with ThreadPoolExecutor(8) as pool:
+            versions = list(pool.map(create, range(32)))
+        assert sorted(versions) == list(range(1, 33))
+        assert client.get("/tasks/", headers=auth).headers["X-Sync-Token"] == "32"
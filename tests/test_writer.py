@@ -0,0 +1,107 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+
+from todo.backend.writer import WriteQueue
+
+# O writer agrupa as operações pendentes numa transação: cada uma em seu SAVEPOINT, um único
+# commit por lote. Os testes seguram o writer numa operação para juntar as seguintes num lote só
+
+
+def foreign_keys(dbapi_connection, connection_record):
+    dbapi_connection.execute("PRAGMA foreign_keys = ON")
+
+
+@pytest.fixture
+def url(tmp_path):
+    url = f"sqlite:///{tmp_path}/writer.db"
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE parents (id INTEGER PRIMARY KEY)")
+        # Checada só no COMMIT: a violação passa pelo SAVEPOINT e derruba o commit do lote
+        conn.exec_driver_sql("CREATE TABLE items (value INTEGER NOT NULL, "
+                             "parent_id INTEGER REFERENCES parents (id) DEFERRABLE INITIALLY DEFERRED)")
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def make_queue(url):
+    queues = []
+
+    def make_queue(max_batch=64):
+        write_queue = WriteQueue(url, max_batch, foreign_keys)
+        queues.append(write_queue)
+        return write_queue
+    yield make_queue
+    for write_queue in queues:
+        write_queue.close()
+
+
+def items(url) -> list[int]:
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        values = conn.scalars(text("SELECT value FROM items ORDER BY rowid")).all()
+    engine.dispose()
+    return values
+
+
+def insert(db, value, parent_id=None):
+    db.execute(text("INSERT INTO items (value, parent_id) VALUES (:value, :parent_id)"),
+               {"value": value, "parent_id": parent_id})
+    return value
+
+
+def fail(db, value):
+    insert(db, value)
+    raise ValueError(value)
+
+
+def hold(write_queue):
+    # Ocupa o writer até set(): o que for enviado nesse meio tempo entra no mesmo lote
+    started, release = threading.Event(), threading.Event()
+    write_queue.submit(lambda db: started.set() or release.wait(5))
+    assert started.wait(5)
+    return release
+
+
+def test_failed_operation_rolls_back_only_its_savepoint(make_queue, url):
+    write_queue = make_queue()
+    release = hold(write_queue)
+    futures = [write_queue.submit(insert, 1), write_queue.submit(fail, 2), write_queue.submit(insert, 3)]
+    release.set()
+    assert futures[0].result(5) == 1
+    with pytest.raises(ValueError):
+        futures[1].result(5)
+    assert futures[2].result(5) == 3
+    assert items(url) == [1, 3]
+
+
+def test_commit_failure_reaches_every_caller(make_queue, url):
+    write_queue = make_queue()
+    release = hold(write_queue)
+    futures = [write_queue.submit(insert, 1), write_queue.submit(fail, 2),
+               write_queue.submit(insert, 3, 999), write_queue.submit(insert, 4)]
+    release.set()
+    # A operação que já tinha falhado recebe o próprio erro; as outras, o do commit
+    errors = [type(future.exception(5)) for future in futures]
+    assert errors == [IntegrityError, ValueError, IntegrityError, IntegrityError]
+    assert items(url) == []
+    # O writer segue atendendo depois do lote perdido
+    assert write_queue.run(insert, 5) == 5
+    assert items(url) == [5]
+
+
+def test_callers_are_served_in_submission_order(make_queue, url):
+    write_queue = make_queue(max_batch=4)
+    release = hold(write_queue)
+    completed = []
+    futures = [write_queue.submit(insert, value) for value in range(10)]
+    for future in futures:
+        future.add_done_callback(lambda future: completed.append(future.result()))
+    release.set()
+    assert [future.result(5) for future in futures] == list(range(10))
+    assert completed == list(range(10))
+    assert items(url) == list(range(10))